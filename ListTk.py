@@ -1,41 +1,41 @@
+import time
+# Script start, for the import and first-paint times logged by main().
+_SCRIPT_START = time.perf_counter()
+import logging
 import streamlit as st
 import pandas as pd
 import numpy as np
-import base64
-from datetime import date
-# from snowflake.snowpark import Session
+from datetime import date, datetime
+from ticket_attachments import attachment_cache
+from ticket_cache import derive, snapshot_cache
+from ticket_index import FILTER_COLS
+from ticket_schema import (
+    BUSINESS_SEGMENT_OPTIONS, FUNCTION_OPTIONS, MODIFIED_COL, PROJECT_STATUS_OPTIONS, REGION_OPTIONS,
+    REQUEST_TYPE_OPTIONS, frame_memory_bytes
+)
+from ticket_diff import ChangeSet, apply_change_set, change_set_from_editor, diff_frames, has_pending_edits
+from ticket_export import EXPORT_FORMATS, export_chunks, frame_chunks, query_chunks, take_export
+from ticket_metrics import RerunMetrics, count_transfer, show_debug_panel
+from ticket_refresher import get_refresher
+from ticket_search import SearchIndex
+from ticket_store import TicketStore, get_store
+from ticket_workload import WorkloadSummary, workload_summary
+# Snowpark is imported on first use (see ticket_session and ticket_store),
+# so the page can render before a connection exists.
+_IMPORTS_DONE = time.perf_counter()
 
 ######################
 # 1) CONFIG & INIT
 ######################
 
-def get_snowflake_session():
-    return Session.builder.configs(st.secrets.snowflake).getOrCreate()
-Session = get_snowflake_session()
-#-> Session:
-#    """Initialize your Snowflake session.
-#       Replace with your actual connection logic."""
-#    return Session.builder.getOrCreate()
-#@st.cache_resource
-#def create_session():
-#session = create_session()
-
-    
-# Filter options for the PM UI
-REGION_OPTIONS = ["All", "NA", "EMEA"]
-BUSINESS_SEGMENT_OPTIONS = ["All", "Snap One", "Business Support Group", "EMEA"]
-FUNCTION_OPTIONS = [
-    "Branch", "Category Management", "Credit", "Customer Service",
-    "Data Analytics", "Data Comm", "DX", "Inventory", "Other", "Outbound Telesales",
-    "Pro AV", "RAS/NAM", "Snap Accounting", "Snap DX", "Snap Manufacturing & Quality",
-    "Snap Operations", "Snap Rewards & Marketing", "Snap Sales", "Snap Support & Education"
-]
-REQUEST_TYPE_OPTIONS = [
-    "Report Request", "BI Tool Inquiry", "BI Tool Request", "Adhoc/Automated"
-]
-PROJECT_STATUS_OPTIONS = [
-    "Not Assigned", "Assigned", "Pending", "Completed"
-]
+logger = logging.getLogger(__name__)
+
+# Snapshots from ticket_cache are shared by every session; copy-on-write keeps filtered views
+# and derived frames from ever writing through to them.
+pd.set_option("mode.copy_on_write", True)
+
+# Page sizes offered in paged query mode.
+PAGE_SIZE_OPTIONS = [50, 100, 250, 500]
 
 # Editable columns for PM (those the PM can modify)
 # Note: "ASSIGNED" is no longer displayed, and "DATE_COMPLETED" is now read-only.
@@ -48,109 +48,316 @@ EDITABLE_COLS = [
 READ_ONLY_COLS = [
     "ID", "DATE_CREATED", "REQUEST_TITLE", "REQUEST_NAME", "DOWNLOAD", "DATE_COMPLETED"
 ]
+# Columns shown in the data editor, in display order.
+SHOW_COLS = [
+    "ID", "DOWNLOAD", "REGION", "BUSINESS_SEGMENT", "FUNCTION_NAME", "REQUESTOR_EMAIL",
+    "DATE_CREATED", "DATE_COMPLETED", "ETC", "REQUEST_TYPE", "REQUEST_TITLE", "REQUEST_NAME",
+    "ASSIGNED_NAME", "PROJECT_STATUS", "COMMENTS"
+]
+# Columns pulled by fetch_tickets. UPLOAD (a stage path, or base64 text of up to ~1.3 MB on older rows)
+# is deliberately left out; it is loaded one ticket at a time by fetch_attachment.
+FETCH_COLS = SHOW_COLS + ["ASSIGNED"]
 
 ######################
 # 2) FETCH & FILTER
 ######################
 
-def fetch_tickets(session: Session) -> pd.DataFrame:
-    """
-    Pull all rows from the table.
-    """
-    df = session.table("DB_ADI_NA_PROD.SCH_ADI_NA_ENDUSER_REPORTS.ADI_TICKET_SYSTEM")
-    return df.to_pandas()
-
-def apply_filters(df: pd.DataFrame, region_filter, bs_filter, function_filter, request_filter, status_filter) -> pd.DataFrame:
-    filtered = df.copy()
-    if region_filter != "All":
-        filtered = filtered[filtered["REGION"] == region_filter]
-    if bs_filter != "All":
-        filtered = filtered[filtered["BUSINESS_SEGMENT"] == bs_filter]
-    if function_filter != "All":
-        filtered = filtered[filtered["FUNCTION_NAME"] == function_filter]
-    if request_filter != "All":
-        filtered = filtered[filtered["REQUEST_TYPE"] == request_filter]
-    if status_filter != "All":
-        filtered = filtered[filtered["PROJECT_STATUS"] == status_filter]
+def fetch_tickets(store: TicketStore, columns=FETCH_COLS) -> pd.DataFrame:
+    """
+    Pull all rows from the table, projected to `columns` (plus MODIFIED_COL if present).
+    Columns missing from the table are skipped.
+    """
+    return store.fetch(columns)
+
+def fetch_ticket_changes(store: TicketStore, snapshot, ids=(), columns=FETCH_COLS):
+    """
+    Delta loader for the snapshot cache: rows with an ID above the snapshot's maximum,
+    rows modified after its MODIFIED_COL watermark, and the rows in `ids`.
+    Returns None when the projected columns no longer match the snapshot (full resync needed).
+    """
+    return store.fetch_changes(snapshot.frame, ids, columns)
+
+# The search index is built with each snapshot by the refresher (and updated from each delta),
+# so the search box only ever queries it; derive() below just looks it up.
+snapshot_cache.prebuild("search_index", SearchIndex.build)
+
+# How often a rerun waiting for the first snapshot checks the load's progress.
+LOAD_POLL_SECONDS = 0.2
+
+def load_snapshot(store: TicketStore, on_batch=None):
+    """
+    Current shared ticket snapshot, refreshed incrementally when stale.
+    Full loads are streamed batch by batch; on_batch(batch, rows_so_far) reports progress.
+    """
+    return snapshot_cache.get(
+        lambda: store.iter_batches(FETCH_COLS),
+        lambda snap, ids: fetch_ticket_changes(store, snap, ids),
+        on_batch,
+    )
+
+def current_snapshot(store: TicketStore, on_progress=None):
+    """
+    Latest published snapshot, without waiting on Snowflake. Every load runs in the background
+    refresher (started on first use). Only the first one in the process is waited for, calling
+    on_progress(first_batch, rows_so_far) as batches arrive. The UI is rendered here, outside
+    the cache's locks, so a rerun that interrupts the wait leaves the load running.
+    """
+    refresher = get_refresher(lambda: load_snapshot(store))
+    shown = None
+    snapshot = snapshot_cache.peek()
+    while snapshot is None:
+        if refresher.last_error:
+            raise RuntimeError(f"Could not load the tickets: {refresher.last_error}")
+        progress = snapshot_cache.loading
+        if on_progress is not None and progress is not None and progress.rows != shown:
+            shown = progress.rows
+            on_progress(progress.first_batch, progress.rows)
+        time.sleep(LOAD_POLL_SECONDS)
+        snapshot = snapshot_cache.peek()
+    return snapshot
+
+def fetch_attachment(store: TicketStore, row_id: int):
+    """
+    Load the UPLOAD value for a single ticket: a stage path (see ticket_attachments),
+    legacy base64 text, or None if it has no file.
+    """
+    return store.fetch_attachment(row_id)
+
+def apply_filters(df: pd.DataFrame, region_filter, bs_filter, function_filter, request_filter, status_filter, index=None,
+                  ids=None) -> pd.DataFrame:
+    """
+    Rows of df matching the five filter selections ("All" = no restriction) and, if given,
+    whose ID is in the sorted array `ids` (search results).
+    With the snapshot's FilterIndex the match is an intersection of precomputed ID arrays;
+    without one (e.g. a query-mode page) the columns are compared directly.
+    """
+    selections = dict(zip(FILTER_COLS, [region_filter, bs_filter, function_filter, request_filter, status_filter]))
+    if index is not None:
+        positions = index.positions(df, selections, ids)
+        return df if positions is None else df.iloc[positions]
+    filtered = df
+    for column, value in selections.items():
+        if value != "All":
+            filtered = filtered[filtered[column] == value]
+    if ids is not None:
+        filtered = filtered[filtered["ID"].isin(ids)]
     return filtered
 
+def fetch_ticket_page(store: TicketStore, filters: dict, after_id=None, page_size: int = 100, columns=FETCH_COLS):
+    """
+    One keyset-paginated page of tickets ordered by ID, with the filter selections pushed
+    down as WHERE predicates. `filters` maps column -> selected value ("All" = no filter).
+    Returns (page, has_next).
+    """
+    page = store.fetch(columns, filters, after_id, limit=page_size + 1)
+    return page.iloc[:page_size], len(page) > page_size
+
+def _next_page():
+    st.session_state.page_cursors.append(st.session_state.page_last_id)
+
+def _previous_page():
+    if len(st.session_state.page_cursors) > 1:
+        st.session_state.page_cursors.pop()
+
+def _clear_export():
+    st.session_state.pop("export", None)
+
+def load_page(store: TicketStore, filters: dict, page_size: int, pinned: bool = False):
+    """
+    Current page for the paged query mode. The keyset cursors (last ID of each previous page)
+    live in session state and reset when the filters or page size change. The page is only
+    re-queried when the cursor, filters or snapshot cache version change; with `pinned`
+    (unsaved editor edits) a newer snapshot version does not replace the page.
+    Returns (page, has_next).
+    """
+    page_key = (tuple(filters.items()), page_size)
+    if st.session_state.get("page_key") != page_key:
+        st.session_state.page_key = page_key
+        st.session_state.page_cursors = [None]
+    query_key = (page_key, st.session_state.page_cursors[-1], snapshot_cache.version)
+    cached = st.session_state.get("page_result")
+    if cached is not None and pinned and cached[0][:2] == query_key[:2]:
+        return cached[1], cached[2]
+    if cached is None or cached[0] != query_key:
+        page, has_next = fetch_ticket_page(store, filters, st.session_state.page_cursors[-1], page_size)
+        cached = (query_key, page, has_next)
+        st.session_state.page_result = cached
+    return cached[1], cached[2]
+
+def attachment_versions(frame: pd.DataFrame) -> dict:
+    """
+    {ticket ID: content version} for the tickets that have a file, in ID order.
+    The version is the MODIFIED_COL value when the table has one; attachments are otherwise
+    written once at submission, so the ID alone identifies the content.
+    """
+    with_file = frame[frame["DOWNLOAD"].notna()]
+    versions = with_file[MODIFIED_COL].tolist() if MODIFIED_COL in with_file.columns else [None] * len(with_file)
+    return dict(zip(with_file["ID"].tolist(), versions))
+
 ######################
-# 3) PARTIAL UPDATE
+# 3) BATCHED UPDATE
 ######################
 
-def update_cell(session: Session, row_id: int, col: str, new_val):
+DATE_COLS = ["DATE_COMPLETED", "ETC"]
+# PROJECT_STATUS of a row added in the editor without one (the table's column default, which
+# the insert would otherwise override with NULL).
+NEW_TICKET_STATUS = "Not Assigned"
+# Columns the change set can write: the PM-editable ones plus the derived ASSIGNED flag.
+STAGED_COLS = list(dict.fromkeys(EDITABLE_COLS + ["ASSIGNED"]))
+
+def _stage_column(column: str, values: pd.Series, flags: pd.Series):
     """
-    Partial UPDATE for a single cell. Minimal conversion is applied for date columns.
+    Convert the flagged cells of one column to the text stored in the staging table.
+    Date columns are normalized to yyyy-mm-dd; unparseable dates are reported and unflagged.
+    Returns (text, flags) -- callers must use the returned flags.
     """
-    if col in ["DATE_COMPLETED", "ETC"]:
-        if not new_val or pd.isna(new_val):
-            set_expr = f"{col} = NULL"
-        else:
-            try:
-                parsed = pd.to_datetime(str(new_val)).date()
-                set_expr = f"{col} = '{parsed}'"
-            except:
-                st.warning(f"Invalid date '{new_val}' for {col}. Skipping update.")
-                return
+    present = values.notna() & (values.astype(str) != "")
+    if column in DATE_COLS:
+        parsed = pd.to_datetime(values.where(present).astype(str), errors="coerce", format="mixed")
+        invalid = flags & present & parsed.isna()
+        for bad in values[invalid]:
+            st.warning(f"Invalid date '{bad}' for {column}. Skipping update.")
+        flags = flags & ~invalid
+        text = parsed.dt.strftime("%Y-%m-%d")
     else:
-        val_str = str(new_val).replace("'", "''")
-        set_expr = f"{col} = '{val_str}'"
-    sql_update = f"""
-        UPDATE DB_ADI_NA_PROD.SCH_ADI_NA_ENDUSER_REPORTS.ADI_TICKET_SYSTEM
-        SET {set_expr}
-        WHERE ID = {row_id}
-    """
-    try:
-        session.sql(sql_update).collect()
-    except Exception as e:
-        st.error(f"Error updating row ID={row_id}, col={col}: {e}")
-
-def apply_diffs_and_update(session: Session, old_df: pd.DataFrame, new_df: pd.DataFrame):
-    """
-    Compare old_df vs. new_df row by row/column by column.
-    For each difference in an EDITABLE column, issue a partial update in Snowflake.
-    Also perform cross-field updates:
-      - Update ASSIGNED based on ASSIGNED_NAME (Y if non-empty, N if empty).
-      - Update DATE_COMPLETED based on PROJECT_STATUS:
-          * If "Completed", set to current date (yyyy-mm-dd).
-          * Otherwise, set to NULL.
-    """
-    old_df = old_df.sort_values("ID").reset_index(drop=True)
-    new_df = new_df.sort_values("ID").reset_index(drop=True)
-    for idx in range(len(new_df)):
-        row_id = new_df.loc[idx, "ID"]
-        # First, update individual cell differences.
-        for col in EDITABLE_COLS:
-            if col not in new_df.columns:
-                continue
-            old_val = old_df.loc[idx, col]
-            new_val = new_df.loc[idx, col]
-            if (pd.isna(old_val) and pd.isna(new_val)):
-                continue
-            if old_val != new_val:
-                update_cell(session, row_id, col, new_val)
-        # Now, perform cross-field updates:
-        # 1) Update ASSIGNED based on ASSIGNED_NAME:
-        new_assigned_name = new_df.loc[idx, "ASSIGNED_NAME"]
-        if pd.notna(new_assigned_name) and str(new_assigned_name).strip() != "":
-            update_cell(session, row_id, "ASSIGNED", "Y")
-        else:
-            update_cell(session, row_id, "ASSIGNED", "N")
-        # 2) Update DATE_COMPLETED based on PROJECT_STATUS:
-        new_status = new_df.loc[idx, "PROJECT_STATUS"]
-        if new_status == "Completed":
-            today_str = str(date.today())
-            update_cell(session, row_id, "DATE_COMPLETED", today_str)
-        else:
-            update_cell(session, row_id, "DATE_COMPLETED", None)
+        text = values.astype(str)
+    return text.where(present & flags, None).astype(object), flags
+
+def stage_changes(base: pd.DataFrame, change_set: ChangeSet) -> pd.DataFrame:
+    """
+    Turn a ChangeSet into the staging frame written by write_change_set.
+    One row per touched ticket: ID (missing for new rows), a DELETED flag, and for every
+    STAGED_COLS column the new value plus a SET_<col> flag. `base` holds the stored values.
+    Cross-field derivations are folded in for edited and added rows:
+      - ASSIGNED is Y if ASSIGNED_NAME is non-empty, N otherwise.
+      - DATE_COMPLETED is today's date when PROJECT_STATUS becomes "Completed"
+        (an existing completion date is kept), and NULL for any other status.
+      - Added rows without a PROJECT_STATUS get NEW_TICKET_STATUS.
+    Derived values are only staged when they differ from what is stored.
+    """
+    changes = change_set.changes[change_set.changes["COLUMN"].isin(EDITABLE_COLS)]
+    ids = pd.unique(changes["ID"])
+    upd_values = changes.pivot(index="ID", columns="COLUMN", values="NEW").reindex(index=ids, columns=STAGED_COLS)
+    upd_flags = (
+        changes.assign(SET=1).pivot(index="ID", columns="COLUMN", values="SET")
+        .reindex(index=ids, columns=STAGED_COLS).notna()
+    )
+    upd_current = base.set_index("ID").reindex(index=ids, columns=STAGED_COLS)
+
+    added = change_set.added
+    add_values = added.reindex(columns=STAGED_COLS).set_axis(added["ID"] if "ID" in added else [None] * len(added))
+    add_values["PROJECT_STATUS"] = add_values["PROJECT_STATUS"].astype(object).fillna(NEW_TICKET_STATUS)
+    add_flags = add_values.notna() & add_values.columns.isin(EDITABLE_COLS)
+    add_current = pd.DataFrame(None, index=add_values.index, columns=STAGED_COLS)
+
+    parts = [p for p in [(upd_values, upd_flags, upd_current), (add_values, add_flags, add_current)] if len(p[0])]
+    parts = parts or [(upd_values, upd_flags, upd_current)]
+    values = pd.concat([p[0].astype(object) for p in parts])
+    flags = pd.concat([p[1].astype(bool) for p in parts])
+    current = pd.concat([p[2].astype(object) for p in parts])
+    # Arrow-backed columns hold pd.NA, which cannot be compared; use None like the other missing values.
+    current = current.where(current.notna(), None)
+
+    # 1) ASSIGNED follows ASSIGNED_NAME.
+    name = values["ASSIGNED_NAME"].where(flags["ASSIGNED_NAME"], current["ASSIGNED_NAME"])
+    assigned = pd.Series(np.where(name.fillna("").astype(str).str.strip() != "", "Y", "N"), index=values.index)
+    values["ASSIGNED"] = assigned
+    flags["ASSIGNED"] = current["ASSIGNED"].ne(assigned)
+    # 2) DATE_COMPLETED follows PROJECT_STATUS.
+    completed = values["PROJECT_STATUS"].where(flags["PROJECT_STATUS"], current["PROJECT_STATUS"]) == "Completed"
+    has_date = current["DATE_COMPLETED"].notna() & (current["DATE_COMPLETED"].astype(str) != "")
+    values["DATE_COMPLETED"] = np.where(completed & ~has_date, str(date.today()), None)
+    flags["DATE_COMPLETED"] = completed != has_date
+
+    for column in STAGED_COLS:
+        values[column], flags[column] = _stage_column(column, values[column], flags[column])
+
+    staged = pd.DataFrame({"ID": pd.array(values.index, dtype="Int64"), "DELETED": False})
+    for column in STAGED_COLS:
+        staged[column] = values[column].to_numpy()
+        staged[f"SET_{column}"] = flags[column].to_numpy()
+    staged = staged[flags.to_numpy().any(axis=1)]
+    deleted = pd.DataFrame({"ID": pd.array(change_set.deleted_ids, dtype="Int64"), "DELETED": True})
+    for column in STAGED_COLS:
+        deleted[column] = None
+        deleted[f"SET_{column}"] = False
+    return pd.concat([staged, deleted], ignore_index=True)
+
+def build_change_set(old_df: pd.DataFrame, new_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Diff old_df vs. new_df on ID and return the staging frame for write_change_set.
+    """
+    return stage_changes(old_df, diff_frames(old_df, new_df, EDITABLE_COLS))
+
+def write_change_set(store: TicketStore, change_set: pd.DataFrame):
+    """
+    Apply a staging frame from stage_changes in one transaction (see TicketStore.write_changes;
+    on Snowflake one bulk load and one MERGE keyed on ID). Rows flagged DELETED are deleted
+    and rows without an ID are inserted; edits to tickets deleted meanwhile are dropped.
+    On commit the shared ticket snapshot is invalidated.
+    Returns (rows_touched, elapsed_seconds).
+    """
+    start = time.perf_counter()
+    if change_set.empty:
+        return 0, time.perf_counter() - start
+    set_cols = [c for c in STAGED_COLS if change_set[f"SET_{c}"].any()]
+    staged = change_set[["ID", "DELETED"] + [c for column in set_cols for c in (column, f"SET_{column}")]].copy()
+    staged["ID"] = staged["ID"].astype("Int64")
+    staged["DELETED"] = staged["DELETED"].astype(bool)
+    for column in set_cols:
+        staged[column] = staged[column].astype("string")
+        staged[f"SET_{column}"] = staged[f"SET_{column}"].astype(bool)
+
+    rows_touched = store.write_changes(staged, set_cols)
+    written = staged[staged["ID"].notna()]
+    snapshot_cache.invalidate(
+        ids=written.loc[~written["DELETED"], "ID"].tolist(),
+        deleted_ids=written.loc[written["DELETED"], "ID"].tolist(),
+    )
+    return rows_touched, time.perf_counter() - start
+
+def apply_diffs_and_update(store: TicketStore, old_df: pd.DataFrame, new_df: pd.DataFrame):
+    """
+    Compare old_df vs. new_df on ID and write every change to the store in one transaction.
+    See stage_changes for the cross-field rules. Returns (rows_touched, elapsed_seconds).
+    """
+    return write_change_set(store, build_change_set(old_df, new_df))
+
+def merge_filtered_edits(original: pd.DataFrame, filtered_old: pd.DataFrame, filtered_new: pd.DataFrame) -> pd.DataFrame:
+    """
+    Fold the edits made to a filtered view (filtered_old -> filtered_new) back into the full frame.
+    """
+    return apply_change_set(original, diff_frames(filtered_old, filtered_new, filtered_new.columns))
 
 ######################
 # 4) MAIN APP
 ######################
 
+def show_workload(summary: WorkloadSummary):
+    """
+    Collapsible dashboard of backlog counts; only the aggregates are sent to the browser.
+    """
+    with st.expander(f"Workload summary ({summary.total:,} tickets)"):
+        by_status, by_assignee = st.columns([3, 2])
+        with by_status:
+            st.caption("Tickets by status and region")
+            st.dataframe(summary.by_region, use_container_width=True)
+            st.caption("Tickets by status and business segment")
+            st.dataframe(summary.by_segment, use_container_width=True)
+        with by_assignee:
+            median_days = summary.median_days_to_complete
+            st.metric("Median days to complete", "–" if median_days is None else f"{median_days:.1f}")
+            st.caption("Open tickets per assignee")
+            st.dataframe(summary.open_by_assignee, hide_index=True, use_container_width=True)
+
 def main():
     st.set_page_config(page_title="Project Manager UI", layout="wide")
-    session = get_snowflake_session()
+    # Per-phase timings and query counts for this rerun; statements are tagged pm/<phase>.
+    rerun = RerunMetrics("pm")
+    rerun.step("controls")
+    # Shared process-wide store (TICKET_STORE picks Snowflake or the local stand-in);
+    # the Snowflake one only connects when a query actually runs.
+    store = get_store()
 
     st.title("Business Support RAIL")
 
@@ -172,16 +379,13 @@ def main():
     </style>
     """, unsafe_allow_html=True)
 
-    # 2) Fetch data from DB
-    df = fetch_tickets(session)
-
-    # 3) Initialize session state for baseline and edited data if not already set
-    if "old_df" not in st.session_state:
-        st.session_state.old_df = df.copy()
-    if "edited_df" not in st.session_state:
-        st.session_state.edited_df = df.copy()
+    # 2) Pending edits live only in the data editor's own sparse delta (edited/added/deleted rows),
+    # stored under its widget key. Bumping the generation after an Apply starts an empty delta.
+    if "editor_generation" not in st.session_state:
+        st.session_state.editor_generation = 0
+    editor_key = f"ticket_editor_{st.session_state.editor_generation}"
 
-    # 4) Filter controls: Order = Region, Business Segment, Function, Request Type, Status, Apply button
+    # 3) Filter controls: Order = Region, Business Segment, Function, Request Type, Status, Apply button
     col1, col2, col3, col4, col5, col6 = st.columns([1,1,1,1,1,1])
     with col1:
         region_filter = st.selectbox("Filter by Region:", REGION_OPTIONS)
@@ -196,92 +400,205 @@ def main():
     with col6:
         st.markdown("<div style='margin-top:1.8rem;'></div>", unsafe_allow_html=True)
         apply_button = st.button("Apply Changes", type="primary")
+        if st.button("Full Reload"):
+            # An explicit reload discards unsaved edits: their row positions refer to the old view.
+            snapshot_cache.resync()
+            st.session_state.pop("pinned_snapshot", None)
+            st.session_state.editor_generation += 1
+            editor_key = f"ticket_editor_{st.session_state.editor_generation}"
+
+    # Paged query mode pushes the filters into the Snowflake query and loads one page at a time.
+    query_mode = st.sidebar.toggle("Paged query mode", help="Filter in Snowflake and load one page of tickets at a time.")
+    page_size = st.sidebar.selectbox("Page size:", PAGE_SIZE_OPTIONS, index=1, disabled=not query_mode)
+    search_text = st.text_input(
+        "Search tickets:", placeholder="Words or word prefixes from the title, name or comments",
+        disabled=query_mode, help="Not available in paged query mode.",
+    )
+    # Export of the whole filtered/searched view (every page in query mode), written in chunks to a file.
+    export1, export2, export3 = st.columns([1, 1, 4])
+    with export1:
+        export_format = st.selectbox("Export format:", list(EXPORT_FORMATS), label_visibility="collapsed")
+    with export2:
+        export_button = st.button("Export view", help="All rows matching the filters and search, without attachments.")
+    show_performance = st.sidebar.toggle("Performance panel", help="Phase timings and query counts for each rerun.")
+    filters = dict(zip(FILTER_COLS, [region_filter, bs_filter, function_filter, request_filter, status_filter]))
+
+    # While a full load streams in, show the first page and a running count as soon as batches land.
+    loading = st.empty()
+
+    def show_progress(first_batch, rows_so_far):
+        with loading.container():
+            st.caption(f"Loading tickets from Snowflake… {rows_so_far:,} so far")
+            if first_batch is not None:
+                preview = first_batch[[c for c in SHOW_COLS if c in first_batch.columns]].head(page_size)
+                st.dataframe(preview, hide_index=True, use_container_width=True)
+
+    def load_view():
+        """
+        (base rows, displayed rows, has_next): one page in query mode, else the shared snapshot.
+        While the editor holds unsaved edits the previously shown data is kept: st.data_editor
+        resets its delta whenever its data changes, so a background refresh would drop the edits.
+        """
+        rerun.step("load")
+        pinned = has_pending_edits(st.session_state.get(editor_key))
+        if query_mode:
+            page, has_next = load_page(store, filters, page_size, pinned)
+            return page, page, has_next
+        snapshot = st.session_state.get("pinned_snapshot") if pinned else None
+        if snapshot is None:
+            snapshot = current_snapshot(store, on_progress=show_progress)
+            st.session_state.pinned_snapshot = snapshot
+        rerun.step("filter")
+        # The search index is built on the first search against a snapshot and then kept up to date by the cache.
+        matches = derive(snapshot, "search_index", SearchIndex.build).search(search_text) if search_text.strip() else None
+        filtered = apply_filters(snapshot.frame, region_filter, bs_filter, function_filter, request_filter, status_filter,
+                                 index=snapshot.filter_index, ids=matches)
+        return snapshot.frame, filtered, False
 
     st.info("Edit cells as needed. Click 'Apply Changes' above to commit all edits.")
 
-    # 5) Filter the local edited_df for display
-    filtered_df = apply_filters(st.session_state.edited_df, region_filter, bs_filter, function_filter, request_filter, status_filter)
-
-    # 6) Define the columns in desired order.
-    # Order: ID, DOWNLOAD, REGION, BUSINESS_SEGMENT, FUNCTION_NAME, REQUESTOR_EMAIL, DATE_CREATED, DATE_COMPLETED, ETC, REQUEST_TYPE, REQUEST_TITLE, REQUEST_NAME, ASSIGNED_NAME, PROJECT_STATUS, COMMENTS
-    show_cols = [
-        "ID", "DOWNLOAD", "REGION", "BUSINESS_SEGMENT", "FUNCTION_NAME", "REQUESTOR_EMAIL",
-        "DATE_CREATED", "DATE_COMPLETED", "ETC", "REQUEST_TYPE", "REQUEST_TITLE", "REQUEST_NAME",
-        "ASSIGNED_NAME", "PROJECT_STATUS", "COMMENTS"
-    ]
-    final_cols = [c for c in show_cols if c in filtered_df.columns]
+    # 4) Load data: from the shared snapshot (kept fresh by the background refresher) or a single page
+    df, filtered_df, has_next = load_view()
+    loading.empty()
+    rerun.step("status")
+    if not query_mode:
+        snapshot = snapshot_cache.peek()
+        snapshot_mb = derive(snapshot, "memory_bytes", frame_memory_bytes) / 1e6
+        st.sidebar.caption(f"Ticket snapshot: {len(df):,} rows, {snapshot_mb:.1f} MB, shared by all sessions")
+        staleness = get_refresher(lambda: load_snapshot(store)).staleness()
+        as_of = datetime.fromtimestamp(staleness["as_of"]).strftime("%H:%M:%S")
+        synced_at = datetime.fromtimestamp(staleness["synced_at"]).strftime("%H:%M:%S")
+        status = " · refreshing…" if staleness["refreshing"] else ""
+        st.caption(
+            f"Data as of {as_of} ({staleness['age_seconds']:.0f}s ago, "
+            f"at most {staleness['max_age_seconds']:.0f}s behind Snowflake; last full reload {synced_at}){status}"
+        )
+        if st.session_state.pinned_snapshot is not snapshot:
+            st.caption(
+                "Showing the data your unsaved edits were made on; newer data appears after Apply Changes or Full Reload."
+            )
+        if staleness["error"]:
+            failing_since = datetime.fromtimestamp(staleness["failing_since"]).strftime("%H:%M:%S")
+            st.warning(f"Background refresh failing since {failing_since}; showing older data. {staleness['error']}")
+
+    # 5) When "Apply Changes" is clicked, turn the editor delta into a change set and update DB.
+    # Positional row indices are mapped back to ticket IDs through the view shown on the previous run.
+    if apply_button:
+        rerun.step("diff")
+        change_set = change_set_from_editor(
+            st.session_state.get(editor_key), st.session_state.get("editor_view_ids", []), df
+        )
+        try:
+            staged = stage_changes(df, change_set)
+            rerun.step("write")
+            rows_touched, elapsed = write_change_set(store, staged)
+        except Exception as e:
+            st.error(f"Error applying changes, nothing was written: {e}")
+        else:
+            # Show the committed edits right away instead of waiting for the background refresh.
+            if not query_mode:
+                load_snapshot(store)
+            st.session_state.editor_generation += 1
+            editor_key = f"ticket_editor_{st.session_state.editor_generation}"
+            df, filtered_df, has_next = load_view()
+            st.success(f"Updated {rows_touched} ticket(s) in Snowflake in {elapsed:.2f}s. Data refreshed from DB.")
+
+    # Export: streamed from the filtered snapshot view, or from the filter query in paged mode.
+    if export_button:
+        rerun.step("export")
+        export_cols = [c for c in SHOW_COLS if c in filtered_df.columns]
+        chunks = query_chunks(store, export_cols, filters) if query_mode else frame_chunks(filtered_df, export_cols)
+        _clear_export()
+        try:
+            export_file = export_chunks(chunks, export_cols, export_format)
+            st.session_state.export = (export_file, take_export(export_file))
+        except Exception as e:
+            export3.error(f"Export failed: {e}")
+    # The finished file is read once and kept with the session until it is downloaded (or replaced);
+    # nothing stays on disk, so sessions that end without downloading leave no files behind.
+    if "export" in st.session_state:
+        export_file, export_data = st.session_state.export
+        with export3:
+            st.download_button(
+                f"Download {export_file.file_name} ({export_file.rows:,} rows, {export_file.size_bytes / 1e6:.1f} MB)",
+                data=export_data,
+                file_name=export_file.file_name,
+                mime=export_file.mime,
+                on_click=_clear_export,
+            )
+
+    # Workload dashboard over the whole snapshot, computed once per snapshot (until the next write or refresh).
+    if not query_mode:
+        rerun.step("dashboard")
+        show_workload(derive(snapshot_cache.peek(), "workload", workload_summary))
+
+    # 6) Columns in display order (see SHOW_COLS).
+    rerun.step("editor")
+    final_cols = [c for c in SHOW_COLS if c in filtered_df.columns]
     disabled_cols = ["ID", "DATE_CREATED", "REQUEST_TITLE", "REQUEST_NAME", "DOWNLOAD", "DATE_COMPLETED"]
 
-    # 7) Data editor for the filtered local copy
-    new_edited_df = st.data_editor(
+    # 7) Data editor for the filtered view. Only the row IDs are kept to resolve the next delta.
+    st.session_state.editor_view_ids = filtered_df["ID"].to_numpy()
+    count_transfer(len(filtered_df), frame_memory_bytes(filtered_df[final_cols]))
+    st.data_editor(
         filtered_df[final_cols],
+        key=editor_key,
         num_rows="dynamic",
         hide_index=True,
         use_container_width=True,
-        disabled=disabled_cols
+        disabled=disabled_cols,
+        column_config={c: st.column_config.DateColumn(c, format="YYYY-MM-DD") for c in ["DATE_CREATED"] + DATE_COLS}
     )
+    if "first_paint_logged" not in st.session_state:
+        st.session_state.first_paint_logged = True
+        logger.info("PM UI: imports %.0f ms, first paint %.0f ms",
+                    (_IMPORTS_DONE - _SCRIPT_START) * 1000, (time.perf_counter() - _SCRIPT_START) * 1000)
 
-    # 8) When "Apply Changes" is clicked, merge changes and update DB
-    if apply_button:
-        def merge_filtered_edits(original: pd.DataFrame, filtered_old: pd.DataFrame, filtered_new: pd.DataFrame) -> pd.DataFrame:
-            merged = original.copy()
-            merged.set_index("ID", inplace=True)
-            filtered_old = filtered_old.set_index("ID")
-            filtered_new = filtered_new.set_index("ID")
-            for idx in filtered_new.index:
-                for col in filtered_new.columns:
-                    if col not in merged.columns:
-                        continue
-                    old_val = filtered_old.loc[idx, col]
-                    new_val = filtered_new.loc[idx, col]
-                    if (pd.isna(old_val) and pd.isna(new_val)):
-                        continue
-                    if old_val != new_val:
-                        merged.at[idx, col] = new_val
-            merged.reset_index(inplace=True)
-            return merged
-
-        updated_full = merge_filtered_edits(st.session_state.edited_df, filtered_df, new_edited_df)
-        st.session_state.edited_df = updated_full.copy()
-
-        old_filtered = apply_filters(st.session_state.old_df, region_filter, bs_filter, function_filter, request_filter, status_filter)
-        if len(new_edited_df) == len(old_filtered):
-            apply_diffs_and_update(session, old_filtered, new_edited_df)
-            fresh_df = fetch_tickets(session)
-            st.session_state.old_df = fresh_df.copy()
-            st.session_state.edited_df = fresh_df.copy()
-            st.success("All changes applied to Snowflake. Data reloaded from DB.")
-        else:
-            st.warning("Shape mismatch. Possibly filters changed row counts, so no updates applied.")
+    # 8) Page navigation (query mode only)
+    if query_mode:
+        st.session_state.page_last_id = filtered_df["ID"].iloc[-1] if not filtered_df.empty else None
+        page_number = len(st.session_state.page_cursors)
+        nav1, nav2, nav3 = st.columns([1, 1, 6])
+        with nav1:
+            st.button("Previous", on_click=_previous_page, disabled=page_number == 1)
+        with nav2:
+            st.button("Next", on_click=_next_page, disabled=not has_next)
+        with nav3:
+            st.caption(f"Page {page_number} · {len(filtered_df)} ticket(s)")
 
-    # 9) Download Section for files using the DOWNLOAD column
-    download_df = st.session_state.edited_df[st.session_state.edited_df["DOWNLOAD"].notna()]
-    if not download_df.empty:
+    # 9) Download Section for files using the DOWNLOAD column.
+    rerun.step("downloads")
+    # The UPLOAD blob is not part of the fetched frame; it is loaded on demand for the selected ticket
+    # and kept decoded in the shared attachment cache, so repeated renders don't touch the DB.
+    if query_mode:
+        downloads = attachment_versions(df)
+    else:
+        downloads = derive(snapshot_cache.peek(), "attachment_versions", attachment_versions)
+    if downloads:
         st.markdown("### Download Files")
-        download_ids = download_df["ID"].tolist()
-        selected_id = st.selectbox("Select Ticket ID to download file:", ["None"] + [str(x) for x in download_ids])
+        selected_id = st.selectbox("Select Ticket ID to download file:", ["None"] + [str(x) for x in downloads])
         if selected_id != "None":
-            row = download_df[st.session_state.edited_df["ID"] == int(selected_id)]
-            if not row.empty:
-                # Retrieve file data from the hidden UPLOAD column
-                upload_val = st.session_state.edited_df.loc[st.session_state.edited_df["ID"] == int(selected_id), "UPLOAD"]
-                if not upload_val.empty:
-                    base64_upload = upload_val.values[0]
-                    if pd.notna(base64_upload) and base64_upload != "[NULL]":
-                        try:
-                            decoded_bytes = base64.b64decode(base64_upload)
-                            st.download_button(
-                                "Download File",
-                                data=decoded_bytes,
-                                file_name=f"ticket_{selected_id}.xlsx",
-                                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-                            )
-                        except Exception as e:
-                            st.error(f"Error decoding file: {e}")
-                    else:
-                        st.write("No File")
+            ticket_id = int(selected_id)
+            try:
+                file_bytes, file_name = attachment_cache.get(
+                    (ticket_id, downloads.get(ticket_id)),
+                    lambda: store.read_attachment(fetch_attachment(store, ticket_id)),
+                )
+                if file_bytes is not None:
+                    st.download_button(
+                        "Download File",
+                        data=file_bytes,
+                        file_name=file_name or f"ticket_{selected_id}.xlsx",
+                        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                    )
                 else:
                     st.write("No File")
+            except Exception as e:
+                st.error(f"Error decoding file: {e}")
+
+    record = rerun.finish(st.session_state)
+    if show_performance:
+        show_debug_panel(record)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,123 @@
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import namedtuple
+
+import pandas as pd
+import pyarrow as pa
+
+from ticket_schema import tickets_from_arrow
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows; the store then runs without a cross-process lock
+    fcntl = None
+
+######################
+# ON-DISK SHARED SNAPSHOT
+######################
+
+logger = logging.getLogger(__name__)
+
+# Directory shared by the app processes of one deployment (set TICKET_SNAPSHOT_DIR to enable
+# sharing; unset or empty keeps every process on its own snapshot). Each data source gets its
+# own subdirectory in it.
+DEFAULT_SNAPSHOT_DIR = os.environ.get("TICKET_SNAPSHOT_DIR", "")
+
+# Header of the current snapshot file. `version` increases with every write; `started_at` is when
+# the refresh that produced it began, so readers can tell whether it can include their own writes.
+# `source` identifies the backend and table it was loaded from (see ticket_store.store_source).
+SnapshotInfo = namedtuple("SnapshotInfo", ["version", "file", "started_at", "written_at", "synced_at", "source"])
+
+CURRENT_FILE = "CURRENT.json"
+LOCK_FILE = "refresh.lock"
+
+class DiskSnapshotStore:
+    """
+    Ticket snapshot shared across processes as an Arrow IPC file. One process refreshes
+    under an exclusive file lock and publishes a new versioned file by atomic rename;
+    the others memory-map it read-only, so N replicas share one copy in the page cache.
+    Files are kept per `source` and a file written for another source is never read.
+    """
+
+    def __init__(self, directory: str, source: str):
+        self.source = source
+        self.directory = os.path.join(directory, hashlib.sha256(source.encode()).hexdigest()[:16])
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    @contextlib.contextmanager
+    def lock(self):
+        """
+        Exclusive, blocking cross-process lock held while refreshing from the warehouse.
+        """
+        with open(self._path(LOCK_FILE), "a") as handle:
+            if fcntl is not None:
+                fcntl.flock(handle, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(handle, fcntl.LOCK_UN)
+
+    def current(self):
+        """
+        Header of the published snapshot, or None if nothing has been written yet for this source.
+        """
+        try:
+            with open(self._path(CURRENT_FILE)) as handle:
+                info = SnapshotInfo(**json.load(handle))
+        except (FileNotFoundError, ValueError, TypeError):
+            return None
+        return info if info.source == self.source else None
+
+    def write(self, frame: pd.DataFrame, started_at: float, synced_at: float) -> SnapshotInfo:
+        """
+        Publish `frame` as the next version. Call with lock() held.
+        """
+        previous = self.current()
+        version = previous.version + 1 if previous else 1
+        info = SnapshotInfo(version, f"tickets-{version}.arrow", started_at, time.time(), synced_at, self.source)
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), b"snapshot_version": str(version).encode()})
+        tmp_path = self._path(info.file + ".tmp")
+        with pa.OSFile(tmp_path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        os.replace(tmp_path, self._path(info.file))
+        tmp_current = self._path(CURRENT_FILE + ".tmp")
+        with open(tmp_current, "w") as handle:
+            json.dump(info._asdict(), handle)
+        os.replace(tmp_current, self._path(CURRENT_FILE))
+        # Keep the previous file for readers still switching over; mapped files survive unlinking.
+        if previous is not None:
+            for name in os.listdir(self.directory):
+                if name.startswith("tickets-") and name not in (info.file, previous.file):
+                    with contextlib.suppress(OSError):
+                        os.remove(self._path(name))
+        return info
+
+    def read(self, info: SnapshotInfo) -> pd.DataFrame:
+        """
+        Memory-map the snapshot file read-only. String columns stay backed by the mapped Arrow buffers.
+        """
+        source = pa.memory_map(self._path(info.file), "r")
+        table = pa.ipc.open_file(source).read_all()
+        return tickets_from_arrow(table)
+
+def default_store(source):
+    """
+    Store in DEFAULT_SNAPSHOT_DIR for `source`, or None when sharing is disabled, the source
+    cannot be shared (None) or the directory is unusable.
+    """
+    if not DEFAULT_SNAPSHOT_DIR or source is None:
+        return None
+    try:
+        return DiskSnapshotStore(DEFAULT_SNAPSHOT_DIR, source)
+    except OSError as e:
+        logger.warning("Ticket snapshot sharing disabled: %s", e)
+        return None
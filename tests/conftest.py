@@ -0,0 +1,55 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# The app modules live at the repository root.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tk  # noqa: E402
+from ticket_store import LocalTicketStore  # noqa: E402
+
+@pytest.fixture
+def store():
+    """
+    In-memory local store holding five tickets (IDs 1-5, titles T1-T5).
+    """
+    store = LocalTicketStore(":memory:")
+    tk.insert_tickets(store, [
+        tk.ticket_row("DX", "pm@adiglobal.com", "Report Request", f"T{i}", f"Name {i}") for i in range(1, 6)
+    ])
+    return store
+
+def _tickets(n=40, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "ID": np.arange(1, n + 1),
+        "REGION": pd.Categorical(rng.choice(["NA", "EMEA"], n)),
+        "BUSINESS_SEGMENT": pd.Categorical(rng.choice(["Snap One", "EMEA"], n)),
+        "FUNCTION_NAME": pd.Categorical(rng.choice(["DX", "Credit", "Other"], n)),
+        "REQUEST_TYPE": pd.Categorical(rng.choice(["Report Request", "BI Tool Inquiry"], n)),
+        "PROJECT_STATUS": pd.Categorical(rng.choice(["Assigned", "Completed"], n)),
+        "REQUEST_TITLE": [f"Sales report {i}" for i in range(1, n + 1)],
+        "REQUEST_NAME": pd.array([f"Weekly margin {i % 3}" for i in range(1, n + 1)], dtype="string[pyarrow]"),
+        "COMMENTS": pd.array([None if i % 4 else f"follow up {i}" for i in range(1, n + 1)], dtype="string[pyarrow]"),
+    })
+
+@pytest.fixture
+def frame():
+    """
+    Forty synthetic tickets with filter columns and searchable text, without a store.
+    """
+    return _tickets()
+
+@pytest.fixture
+def change(frame):
+    """
+    (frame, rows, deleted_ids) for a delta: tickets 3 and 10 edited, 41 added and 7 deleted.
+    """
+    rows = frame[frame["ID"].isin([3, 10])].copy()
+    rows["PROJECT_STATUS"] = pd.Categorical(["Pending", "Pending"])
+    rows["COMMENTS"] = pd.array(["brand new words", None], dtype="string[pyarrow]")
+    added = _tickets(1, seed=1).assign(ID=[41], REQUEST_TITLE=["Inventory aging"])
+    return frame, pd.concat([rows, added], ignore_index=True), [7]
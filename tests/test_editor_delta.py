@@ -0,0 +1,24 @@
+import pandas as pd
+
+from ticket_diff import change_set_from_editor, has_pending_edits
+
+def frame(ids, comments):
+    return pd.DataFrame({"ID": ids, "COMMENTS": pd.array(comments, dtype="string[pyarrow]")})
+
+def test_change_set_from_editor_maps_positions_to_ids():
+    base = frame([10, 20, 30], ["a", "b", "c"])
+    delta = {
+        "edited_rows": {"1": {"COMMENTS": "B"}, "2": {"COMMENTS": "c"}},
+        "added_rows": [{"COMMENTS": "new"}],
+        "deleted_rows": [0],
+    }
+    change_set = change_set_from_editor(delta, [10, 20, 30], base)
+    assert change_set.changes[["ID", "OLD", "NEW"]].values.tolist() == [[20, "b", "B"]]
+    assert change_set.added["COMMENTS"].tolist() == ["new"]
+    assert change_set.deleted_ids == [10]
+
+def test_has_pending_edits():
+    assert not has_pending_edits(None)
+    assert not has_pending_edits({"edited_rows": {}, "added_rows": [], "deleted_rows": []})
+    assert has_pending_edits({"edited_rows": {"0": {"COMMENTS": "x"}}, "added_rows": [], "deleted_rows": []})
+    assert has_pending_edits({"edited_rows": {}, "added_rows": [], "deleted_rows": [3]})
@@ -0,0 +1,54 @@
+import json
+import os
+
+import snapshot_store
+from snapshot_store import CURRENT_FILE, DiskSnapshotStore, default_store
+from ticket_cache import SnapshotCache
+
+def publish(store, frame):
+    with store.lock():
+        return store.write(frame, started_at=0.0, synced_at=0.0)
+
+def test_published_snapshot_reads_back(tmp_path, frame):
+    store = DiskSnapshotStore(str(tmp_path), "local:/a.db")
+    assert store.current() is None
+    info = publish(store, frame)
+    assert store.current() == info
+    read = store.read(info)
+    assert read["ID"].tolist() == frame["ID"].tolist()
+    assert read["REQUEST_TITLE"].tolist() == frame["REQUEST_TITLE"].tolist()
+
+def test_versions_increase_and_old_files_are_pruned(tmp_path, frame):
+    store = DiskSnapshotStore(str(tmp_path), "local:/a.db")
+    infos = [publish(store, frame) for _ in range(3)]
+    assert [i.version for i in infos] == [1, 2, 3]
+    files = sorted(name for name in os.listdir(store.directory) if name.startswith("tickets-"))
+    assert files == ["tickets-2.arrow", "tickets-3.arrow"]
+
+def test_sources_do_not_see_each_other(tmp_path, frame):
+    local = DiskSnapshotStore(str(tmp_path), "local:/a.db")
+    other = DiskSnapshotStore(str(tmp_path), "local:/b.db")
+    publish(local, frame)
+    assert other.current() is None
+    # A header naming another source is ignored even in this source's directory.
+    with open(os.path.join(local.directory, CURRENT_FILE)) as handle:
+        header = json.load(handle)
+    header["source"] = "snowflake:OTHER"
+    with open(os.path.join(local.directory, CURRENT_FILE), "w") as handle:
+        json.dump(header, handle)
+    assert local.current() is None
+
+def test_sharing_is_opt_in(tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshot_store, "DEFAULT_SNAPSHOT_DIR", "")
+    assert default_store("local:/a.db") is None
+    monkeypatch.setattr(snapshot_store, "DEFAULT_SNAPSHOT_DIR", str(tmp_path))
+    assert default_store(None) is None
+    assert default_store("local:/a.db").source == "local:/a.db"
+
+def test_second_process_adopts_the_published_snapshot(tmp_path, frame):
+    first = SnapshotCache(store=DiskSnapshotStore(str(tmp_path), "local:/a.db"))
+    second = SnapshotCache(store=DiskSnapshotStore(str(tmp_path), "local:/a.db"))
+    first.get(lambda: frame)
+    snapshot = second.get(lambda: frame.iloc[:0])
+    assert (second.shared_loads, second.full_loads) == (1, 0)
+    assert snapshot.frame["ID"].tolist() == frame["ID"].tolist()
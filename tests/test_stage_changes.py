@@ -0,0 +1,76 @@
+from datetime import date
+
+import pandas as pd
+
+import ListTk
+from ticket_diff import ChangeSet, diff_frames, empty_changes
+
+def tickets(**columns):
+    base = {
+        "ID": [1, 2],
+        "ASSIGNED_NAME": [None, "Alex Kim"],
+        "ASSIGNED": ["N", "Y"],
+        "PROJECT_STATUS": ["Not Assigned", "Completed"],
+        "DATE_COMPLETED": [None, "2024-01-05"],
+        "COMMENTS": [None, None],
+    }
+    base.update(columns)
+    return pd.DataFrame(base)
+
+def staged_row(staged, ticket_id):
+    return staged[staged["ID"] == ticket_id].iloc[0]
+
+def stage(old, new):
+    return ListTk.stage_changes(old, diff_frames(old, new, ListTk.EDITABLE_COLS))
+
+def test_assigned_follows_assigned_name():
+    old = tickets()
+    staged = stage(old, tickets(ASSIGNED_NAME=["Sam Patel", None]))
+    assert staged_row(staged, 1)[["ASSIGNED", "SET_ASSIGNED"]].tolist() == ["Y", True]
+    assert staged_row(staged, 2)[["ASSIGNED", "SET_ASSIGNED"]].tolist() == ["N", True]
+
+def test_assigned_not_staged_when_unchanged():
+    old = tickets()
+    staged = stage(old, tickets(COMMENTS=["note", None]))
+    assert staged["ID"].tolist() == [1]
+    assert not staged_row(staged, 1)["SET_ASSIGNED"]
+
+def test_completion_sets_date_completed():
+    old = tickets()
+    staged = stage(old, tickets(PROJECT_STATUS=["Completed", "Completed"]))
+    row = staged_row(staged, 1)
+    assert row["SET_DATE_COMPLETED"] and row["DATE_COMPLETED"] == str(date.today())
+
+def test_existing_completion_date_is_kept():
+    old = tickets()
+    staged = stage(old, tickets(COMMENTS=[None, "done"]))
+    assert not staged_row(staged, 2)["SET_DATE_COMPLETED"]
+
+def test_reopening_clears_date_completed():
+    old = tickets()
+    staged = stage(old, tickets(PROJECT_STATUS=["Not Assigned", "Pending"]))
+    row = staged_row(staged, 2)
+    assert row["SET_DATE_COMPLETED"] and row["DATE_COMPLETED"] is None
+
+def test_added_row_defaults_status():
+    added = pd.DataFrame({"COMMENTS": ["new ticket"]})
+    staged = ListTk.stage_changes(tickets(), ChangeSet(empty_changes(), added, []))
+    row = staged.iloc[0]
+    assert pd.isna(row["ID"])
+    assert row[["PROJECT_STATUS", "SET_PROJECT_STATUS"]].tolist() == [ListTk.NEW_TICKET_STATUS, True]
+
+def test_deleted_rows_are_flagged():
+    staged = ListTk.stage_changes(tickets(), ChangeSet(empty_changes(), pd.DataFrame(), [2]))
+    assert staged[["ID", "DELETED"]].values.tolist() == [[2, True]]
+
+def test_invalid_date_is_not_staged():
+    old = tickets(ETC=["2024-02-01", None])
+    staged = stage(old, tickets(ETC=["garbage", None], COMMENTS=["note", None]))
+    row = staged_row(staged, 1)
+    assert not row["SET_ETC"]
+    assert row[["COMMENTS", "SET_COMMENTS"]].tolist() == ["note", True]
+
+def test_row_with_only_an_invalid_date_is_dropped():
+    old = tickets(ETC=["2024-02-01", None])
+    staged = stage(old, tickets(ETC=["garbage", None]))
+    assert staged.empty
@@ -0,0 +1,48 @@
+from ticket_attachments import AttachmentCache
+
+def loader(size, calls=None):
+    def load():
+        if calls is not None:
+            calls.append(size)
+        return b"x" * size, "file.bin"
+    return load
+
+def test_hit_does_not_reload():
+    cache, calls = AttachmentCache(max_bytes=100), []
+    cache.get((1, "v1"), loader(10, calls))
+    assert cache.get((1, "v1"), loader(10, calls)) == (b"x" * 10, "file.bin")
+    assert calls == [10]
+    assert (cache.hits, cache.misses) == (1, 1)
+
+def test_new_version_is_a_different_entry():
+    cache, calls = AttachmentCache(max_bytes=100), []
+    cache.get((1, "v1"), loader(10, calls))
+    cache.get((1, "v2"), loader(20, calls))
+    assert calls == [10, 20]
+
+def test_least_recently_used_is_evicted_to_fit_the_budget():
+    cache = AttachmentCache(max_bytes=100)
+    for ticket_id in (1, 2, 3):
+        cache.get((ticket_id, "v"), loader(40))
+    assert cache.stats()["entries"] == 2
+    assert cache.size_bytes == 80
+    assert cache.evictions == 1
+    calls = []
+    cache.get((1, "v"), loader(40, calls))
+    assert calls == [40]
+
+def test_recent_use_protects_an_entry():
+    cache = AttachmentCache(max_bytes=100)
+    cache.get((1, "v"), loader(40))
+    cache.get((2, "v"), loader(40))
+    cache.get((1, "v"), loader(40))
+    cache.get((3, "v"), loader(40))
+    calls = []
+    cache.get((1, "v"), loader(40, calls))
+    assert calls == []
+
+def test_oversized_entry_is_returned_but_not_kept():
+    cache = AttachmentCache(max_bytes=100)
+    data, _ = cache.get((1, "v"), loader(150))
+    assert len(data) == 150
+    assert cache.stats()["entries"] == 0 and cache.size_bytes == 0
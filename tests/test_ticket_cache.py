@@ -0,0 +1,45 @@
+import ListTk
+from ticket_cache import SnapshotCache
+from ticket_store import LOCAL_TABLE
+
+def loaders(store, columns):
+    return (
+        lambda: store.iter_batches(columns),
+        lambda snap, ids: store.fetch_changes(snap.frame, ids, columns),
+    )
+
+def test_fetch_changes_includes_rows_at_the_watermark(store):
+    snapshot = ListTk.fetch_tickets(store)
+    watermark = snapshot[ListTk.MODIFIED_COL].max().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+    # Another writer commits in the same millisecond as the newest row already loaded.
+    store.execute(f"UPDATE {LOCAL_TABLE} SET COMMENTS = 'same instant', {ListTk.MODIFIED_COL} = ? WHERE ID = 1",
+                  (watermark,))
+    changes = ListTk.fetch_ticket_changes(store, type("Snapshot", (), {"frame": snapshot}))
+    assert "same instant" in changes.loc[changes["ID"] == 1, "COMMENTS"].tolist()
+
+def test_stale_snapshot_is_refreshed_by_delta(store):
+    cache = SnapshotCache(ttl_seconds=0, resync_seconds=3600)
+    loader, delta_loader = loaders(store, ["ID", "COMMENTS"])
+    cache.get(loader, delta_loader)
+    store.execute(f"UPDATE {LOCAL_TABLE} SET COMMENTS = 'edited elsewhere' WHERE ID = 2")
+    snapshot = cache.get(loader, delta_loader)
+    assert (cache.full_loads, cache.delta_loads) == (1, 1)
+    assert snapshot.frame.loc[snapshot.frame["ID"] == 2, "COMMENTS"].tolist() == ["edited elsewhere"]
+
+def test_table_without_modified_column_is_not_fully_reloaded_on_ttl(store):
+    store.execute(f"DROP TRIGGER {LOCAL_TABLE}_MODIFIED")
+    store.execute(f"ALTER TABLE {LOCAL_TABLE} DROP COLUMN {ListTk.MODIFIED_COL}")
+    cache = SnapshotCache(ttl_seconds=0, resync_seconds=3600)
+    loader, delta_loader = loaders(store, ["ID", "COMMENTS"])
+    cache.get(loader, delta_loader)
+    cache.get(loader, delta_loader)
+    assert (cache.full_loads, cache.delta_loads) == (1, 1)
+
+def test_full_reload_once_resync_is_due(store):
+    cache = SnapshotCache(ttl_seconds=0, resync_seconds=0)
+    loader, delta_loader = loaders(store, ["ID", "COMMENTS"])
+    cache.get(loader, delta_loader)
+    store.execute(f"DELETE FROM {LOCAL_TABLE} WHERE ID = 3")
+    snapshot = cache.get(loader, delta_loader)
+    assert cache.full_loads == 2
+    assert 3 not in snapshot.frame["ID"].tolist()
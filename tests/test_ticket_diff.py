@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+
+from ticket_diff import change_mask, diff_frames
+
+def frame(ids, comments, status=None):
+    data = {"ID": ids, "COMMENTS": pd.array(comments, dtype="string[pyarrow]")}
+    if status is not None:
+        data["PROJECT_STATUS"] = status
+    return pd.DataFrame(data)
+
+def test_change_mask_treats_missing_values_as_equal():
+    old = np.array([[None, np.nan, pd.NA, pd.NaT, "a", None]], dtype=object)
+    new = np.array([[np.nan, pd.NA, None, None, "a", "b"]], dtype=object)
+    assert change_mask(old, new).tolist() == [[False, False, False, False, False, True]]
+
+def test_change_mask_detects_cleared_values():
+    old = np.array([["a", 1.0]], dtype=object)
+    new = np.array([[pd.NA, np.nan]], dtype=object)
+    assert change_mask(old, new).tolist() == [[True, True]]
+
+def test_diff_frames_aligns_on_id_not_position():
+    old = frame([1, 2, 3], ["a", None, "c"])
+    new = frame([3, 1, 2], ["c", "a", "b"])
+    changes = diff_frames(old, new, ["COMMENTS"]).changes
+    assert changes[["ID", "COLUMN", "NEW"]].values.tolist() == [[2, "COMMENTS", "b"]]
+    assert pd.isna(changes["OLD"].iloc[0])
+
+def test_diff_frames_ignores_na_to_na():
+    old = frame([1, 2], [None, "x"])
+    new = frame([1, 2], [pd.NA, "x"]).astype({"COMMENTS": object})
+    assert diff_frames(old, new, ["COMMENTS"]).changes.empty
+
+def test_diff_frames_reports_added_and_deleted_rows():
+    old = frame([1, 2, 3], ["a", "b", "c"])
+    new = pd.concat([frame([1, 3], ["a", "c"]), pd.DataFrame({"ID": [None], "COMMENTS": ["new"]})], ignore_index=True)
+    change_set = diff_frames(old, new, ["COMMENTS"])
+    assert change_set.deleted_ids == [2]
+    assert change_set.added["COMMENTS"].tolist() == ["new"]
+    assert change_set.changes.empty
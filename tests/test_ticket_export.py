@@ -0,0 +1,56 @@
+import os
+import zipfile
+
+import pandas as pd
+import pyarrow.csv as pcsv
+import pyarrow.parquet as pq
+import pytest
+
+from ticket_export import export_chunks, frame_chunks, query_chunks, take_export
+
+COLUMNS = ["ID", "REGION", "REQUEST_TITLE", "COMMENTS"]
+
+def test_parquet_export_matches_the_frame(tmp_path, frame):
+    export = export_chunks(frame_chunks(frame, COLUMNS, chunk_rows=7), COLUMNS, "Parquet", directory=str(tmp_path))
+    assert (export.rows, export.file_name) == (len(frame), "tickets.parquet")
+    table = pq.read_table(export.path)
+    assert table.column_names == COLUMNS
+    assert table.column("ID").to_pylist() == frame["ID"].tolist()
+    comments = frame["COMMENTS"].astype(object)
+    assert table.column("COMMENTS").to_pylist() == comments.where(comments.notna(), None).tolist()
+
+def test_csv_export_has_one_header(tmp_path, frame):
+    export = export_chunks(frame_chunks(frame, COLUMNS, chunk_rows=7), COLUMNS, "CSV", directory=str(tmp_path))
+    table = pcsv.read_csv(export.path)
+    assert table.num_rows == len(frame)
+    assert table.column("REQUEST_TITLE").to_pylist() == frame["REQUEST_TITLE"].tolist()
+
+def test_excel_export_writes_every_row(tmp_path, frame):
+    export = export_chunks(frame_chunks(frame, COLUMNS, chunk_rows=7), COLUMNS, "Excel", directory=str(tmp_path))
+    with zipfile.ZipFile(export.path) as book:
+        sheet = book.read("xl/worksheets/sheet1.xml").decode()
+    assert sheet.count("<row ") == len(frame) + 1
+
+def test_empty_export_keeps_the_columns(tmp_path):
+    export = export_chunks(iter(()), COLUMNS, "Parquet", directory=str(tmp_path))
+    assert export.rows == 0
+    assert pq.read_table(export.path).column_names == COLUMNS
+
+def test_failed_export_leaves_no_file(tmp_path, frame):
+    def failing():
+        yield frame[COLUMNS].iloc[:5]
+        raise ConnectionError("lost the warehouse")
+    with pytest.raises(ConnectionError):
+        export_chunks(failing(), COLUMNS, "CSV", directory=str(tmp_path))
+    assert os.listdir(tmp_path) == []
+
+def test_take_export_reads_and_removes_the_file(tmp_path, frame):
+    export = export_chunks(frame_chunks(frame, COLUMNS), COLUMNS, "CSV", directory=str(tmp_path))
+    data = take_export(export)
+    assert len(data) == export.size_bytes
+    assert not os.path.exists(export.path)
+
+def test_query_chunks_pages_through_the_store(store):
+    pages = list(query_chunks(store, ["ID", "REQUEST_TITLE"], {"PROJECT_STATUS": "All"}, chunk_rows=2))
+    assert [page["ID"].tolist() for page in pages] == [[1, 2], [3, 4], [5]]
+    assert pd.concat(pages)["REQUEST_TITLE"].tolist() == ["T1", "T2", "T3", "T4", "T5"]
@@ -0,0 +1,20 @@
+import numpy as np
+
+from ticket_cache import upsert_rows
+from ticket_index import FilterIndex
+
+def postings(index):
+    return {column: {v: ids.tolist() for v, ids in by_value.items() if len(ids)} for column, by_value in index._ids.items()}
+
+def test_filter_index_update_matches_rebuild(change):
+    frame, rows, deleted = change
+    updated = FilterIndex.build(frame).updated(frame, rows, deleted)
+    assert postings(updated) == postings(FilterIndex.build(upsert_rows(frame, rows, deleted)))
+
+def test_filter_index_positions_intersect_ids(frame):
+    index = FilterIndex.build(frame)
+    selections = {"REGION": "NA", "BUSINESS_SEGMENT": "All"}
+    ids = np.array([1, 2, 3, 4, 5])
+    expected = frame.index[(frame["REGION"] == "NA") & frame["ID"].isin(ids)].tolist()
+    assert index.positions(frame, selections, ids).tolist() == expected
+    assert index.positions(frame, {"REGION": "All"}) is None
@@ -0,0 +1,69 @@
+import queue
+import threading
+
+import pytest
+
+import tk
+from ticket_queue import SubmissionQueue
+from ticket_store import LOCAL_TABLE
+
+class Recorder:
+    """
+    flush() stand-in that records each batch and fails with the queued errors first.
+    """
+
+    def __init__(self, errors=(), gate=None):
+        self.batches = []
+        self.errors = list(errors)
+        self.gate = gate
+
+    def __call__(self, items):
+        if self.gate is not None:
+            self.gate.wait()
+        if self.errors:
+            raise self.errors.pop(0)
+        self.batches.append(list(items))
+
+def test_concurrent_submissions_are_coalesced():
+    gate = threading.Event()
+    flush = Recorder(gate=gate)
+    submissions = SubmissionQueue(flush, max_batch=3, max_delay_ms=50)
+    pending = [submissions.submit(i) for i in range(5)]
+    gate.set()
+    assert [s.future.result(timeout=5) for s in pending] == [s.receipt for s in pending]
+    assert flush.batches == [[0, 1, 2], [3, 4]]
+
+def test_submit_rejects_items_over_the_byte_budget():
+    gate = threading.Event()
+    submissions = SubmissionQueue(Recorder(gate=gate), max_pending_bytes=100)
+    first = submissions.submit("big", size=80)
+    with pytest.raises(queue.Full):
+        submissions.submit("too much", size=30, timeout=0.05)
+    gate.set()
+    first.future.result(timeout=5)
+    submissions.submit("fits again", size=30).future.result(timeout=5)
+    assert submissions.stats()["pending_bytes"] == 0
+
+def test_transient_errors_are_retried():
+    flush = Recorder(errors=[ConnectionError("network blip")])
+    submissions = SubmissionQueue(flush, max_delay_ms=1, backoff_seconds=0.01)
+    submission = submissions.submit("ticket")
+    assert submission.future.result(timeout=5) == submission.receipt
+    assert flush.batches == [["ticket"]]
+
+def test_other_errors_fail_without_retry():
+    flush = Recorder(errors=[ValueError("bad data"), ConnectionError("never reached")])
+    submissions = SubmissionQueue(flush, max_delay_ms=1, backoff_seconds=0.01)
+    submission = submissions.submit("ticket")
+    with pytest.raises(ValueError):
+        submission.future.result(timeout=5)
+    assert submissions.stats()["failed"] == 1
+    assert len(flush.errors) == 1
+
+def test_retried_flush_does_not_insert_twice(store):
+    item = {"receipt": "R1", "function": "DX", "email": "pm@adiglobal.com", "request_type": "Report Request",
+            "request_title": "Retried", "request_name": "Name"}
+    tk.flush_submissions(store, [dict(item)])
+    tk.flush_submissions(store, [dict(item)])
+    rows = store.execute(f"SELECT REQUEST_TITLE, SUBMISSION_ID FROM {LOCAL_TABLE} WHERE SUBMISSION_ID IS NOT NULL")
+    assert rows.fetchall() == [("Retried", "R1")]
@@ -0,0 +1,62 @@
+import threading
+import time
+
+from ticket_cache import SnapshotCache
+from ticket_refresher import SnapshotRefresher
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+def start(frame, failures=0):
+    cache = SnapshotCache(ttl_seconds=60)
+    calls = []
+
+    def loader():
+        calls.append(len(calls))
+        if len(calls) <= failures:
+            raise ConnectionError("warehouse unreachable")
+        return frame
+    refresher = SnapshotRefresher(lambda: cache.get(loader), cache=cache, retry_seconds=0.01)
+    return cache, refresher, calls
+
+def test_first_snapshot_is_loaded_in_the_background(frame):
+    cache, refresher, _ = start(frame)
+    wait_for(lambda: cache.peek() is not None)
+    staleness = refresher.staleness()
+    assert not staleness["refreshing"] and staleness["error"] is None
+    assert staleness["max_age_seconds"] >= cache.ttl_seconds
+
+def test_invalidate_triggers_a_refresh(frame):
+    cache, refresher, calls = start(frame)
+    wait_for(lambda: cache.peek() is not None)
+    cache.invalidate()
+    assert refresher.staleness()["refreshing"]
+    wait_for(lambda: cache.peek().version == cache.version)
+    wait_for(lambda: refresher.refreshes == 2)
+    assert len(calls) == 2
+
+def test_failed_refreshes_are_retried_until_one_succeeds(frame):
+    cache, refresher, calls = start(frame, failures=2)
+    wait_for(lambda: cache.peek() is not None)
+    wait_for(lambda: refresher.refreshes == 1)
+    assert len(calls) == 3
+    assert refresher.last_error is None and refresher.failing_since is None
+
+def test_staleness_reports_a_failing_refresh(frame):
+    cache = SnapshotCache(ttl_seconds=60)
+    recovered = threading.Event()
+
+    def loader():
+        if not recovered.is_set():
+            raise ConnectionError("warehouse unreachable")
+        return frame
+    refresher = SnapshotRefresher(lambda: cache.get(loader), cache=cache, retry_seconds=0.01)
+    wait_for(lambda: refresher.last_error is not None)
+    staleness = refresher.staleness()
+    assert staleness["as_of"] is None and staleness["refreshing"]
+    assert "unreachable" in staleness["error"] and staleness["failing_since"] is not None
+    recovered.set()
+    wait_for(lambda: refresher.staleness()["error"] is None)
@@ -0,0 +1,34 @@
+from ticket_cache import SnapshotCache, upsert_rows
+from ticket_search import SearchIndex
+
+def test_search_is_prefix_and_all_terms(frame):
+    index = SearchIndex.build(frame)
+    assert index.search("") is None
+    assert index.search("sal rep 25").tolist() == [25]
+    assert index.search("report 3").tolist() == [3, 30, 31, 32, 33, 34, 35, 36, 37, 38, 39]
+    assert index.search("FOLLOW").tolist() == [4, 8, 12, 16, 20, 24, 28, 32, 36, 40]
+    # "2" matches "margin 2" as well as titles and comments numbered 2x.
+    assert index.search("weekly margin 2 follow").tolist() == [8, 20, 24, 28, 32]
+    assert len(index.search("nothingmatches")) == 0
+
+def test_search_index_update_matches_rebuild(change):
+    frame, rows, deleted = change
+    updated = SearchIndex.build(frame).updated(frame, rows, deleted)
+    rebuilt = SearchIndex.build(upsert_rows(frame, rows, deleted))
+    assert sorted(updated._postings) == sorted(rebuilt._postings)
+    for term, ids in rebuilt._postings.items():
+        assert updated._postings[term].tolist() == ids.tolist()
+    assert updated.search("brand").tolist() == [3]
+    assert updated.search("inventory").tolist() == [41]
+
+def test_search_index_is_built_with_the_snapshot(change):
+    frame, rows, deleted = change
+    cache = SnapshotCache(ttl_seconds=0, resync_seconds=3600)
+    cache.prebuild("search_index", SearchIndex.build)
+    snapshot = cache.get(lambda: frame, lambda snap, ids: rows)
+    assert snapshot.derived["search_index"].search("sales report 12").tolist() == [12]
+    cache.invalidate(deleted_ids=deleted)
+    refreshed = cache.get(lambda: frame, lambda snap, ids: rows)
+    assert cache.delta_loads == 1
+    assert refreshed.derived["search_index"].search("inventory").tolist() == [41]
+    assert len(refreshed.derived["search_index"].search("sales report 7")) == 0
@@ -0,0 +1,64 @@
+import os
+
+import pandas as pd
+import pytest
+
+import ListTk
+from ticket_store import LOCAL_TABLE, LocalTicketStore, TicketStore, store_source
+
+def rows(store, columns="ID, REQUEST_TITLE, COMMENTS, PROJECT_STATUS"):
+    return store.execute(f"SELECT {columns} FROM {LOCAL_TABLE} ORDER BY ID").fetchall()
+
+def edited(frame, ticket_id, **values):
+    new = frame.astype({c: object for c in values})
+    for column, value in values.items():
+        new.loc[new["ID"] == ticket_id, column] = value
+    return new
+
+def test_update_touches_only_flagged_columns(store):
+    old = ListTk.fetch_tickets(store)
+    ListTk.apply_diffs_and_update(store, old, edited(old, 2, COMMENTS="note"))
+    assert rows(store)[1] == (2, "T2", "note", "Not Assigned")
+    assert [r[2] for r in rows(store)].count("note") == 1
+
+def test_delete_and_insert(store):
+    old = ListTk.fetch_tickets(store)
+    new = pd.concat([old[old["ID"] != 3], pd.DataFrame({"COMMENTS": ["added"]})], ignore_index=True)
+    ListTk.apply_diffs_and_update(store, old, new)
+    result = rows(store)
+    assert [r[0] for r in result] == [1, 2, 4, 5, 6]
+    assert result[-1] == (6, None, "added", "Not Assigned")
+
+def test_edit_to_deleted_ticket_is_not_inserted(store):
+    # Regression: the edit used to be inserted as a new ticket holding only the edited columns.
+    old = ListTk.fetch_tickets(store)
+    store.execute(f"DELETE FROM {LOCAL_TABLE} WHERE ID = 4")
+    touched, _ = ListTk.apply_diffs_and_update(store, old, edited(old, 4, COMMENTS="late edit"))
+    assert touched == 0
+    assert [r[0] for r in rows(store)] == [1, 2, 3, 5]
+
+def test_store_interface_is_abstract():
+    class Partial(TicketStore):
+        def fetch(self, columns, filters=None, after_id=None, limit=None):
+            return pd.DataFrame()
+    with pytest.raises(TypeError):
+        Partial()
+
+def test_filters_and_keyset_paging(store):
+    store.execute(f"UPDATE {LOCAL_TABLE} SET PROJECT_STATUS = 'Completed' WHERE ID IN (2, 4, 5)")
+    page = store.fetch(["ID", "PROJECT_STATUS"], {"PROJECT_STATUS": "Completed", "REGION": "All"}, after_id=2, limit=1)
+    assert page["ID"].tolist() == [4]
+    assert ListTk.MODIFIED_COL in page.columns
+
+def test_batches_cover_the_table_in_id_order():
+    store = LocalTicketStore(":memory:", batch_rows=2)
+    store.insert_rows(["REQUEST_TITLE"], [(f"T{i}",) for i in range(5)])
+    assert [batch["ID"].tolist() for batch in store.iter_batches(["ID"])] == [[1, 2], [3, 4], [5]]
+
+def test_local_store_creates_its_directory_and_names_its_source(tmp_path):
+    path = tmp_path / "nested" / "tickets.db"
+    LocalTicketStore(str(path))
+    assert path.exists()
+    assert store_source("local", str(path)) == f"local:{os.path.abspath(path)}"
+    assert store_source("local", ":memory:") is None
+    assert store_source("snowflake").startswith("snowflake:")
@@ -0,0 +1,109 @@
+import base64
+import io
+import math
+import os
+import re
+import threading
+import uuid
+from collections import OrderedDict
+
+######################
+# ATTACHMENT STORAGE
+######################
+
+# Internal stage holding ticket attachments as raw files. The ticket's UPLOAD column stores
+# the staged file's path (starting with "@") instead of the base64-encoded workbook.
+ATTACHMENT_STAGE = "DB_ADI_NA_PROD.SCH_ADI_NA_ENDUSER_REPORTS.ADI_TICKET_ATTACHMENTS"
+# Largest attachment accepted by the submission form.
+MAX_ATTACHMENT_BYTES = 25_000_000
+# Total size of decoded attachments kept in memory per process (override with ATTACHMENT_CACHE_BYTES).
+DEFAULT_CACHE_BYTES = int(os.environ.get("ATTACHMENT_CACHE_BYTES", str(64 * 1024 * 1024)))
+
+_stage_ready = False
+
+def is_stage_reference(upload_value) -> bool:
+    return isinstance(upload_value, str) and upload_value.startswith("@")
+
+def _ensure_stage(session):
+    global _stage_ready
+    if not _stage_ready:
+        session.sql(f"CREATE STAGE IF NOT EXISTS {ATTACHMENT_STAGE}").collect()
+        _stage_ready = True
+
+def safe_file_name(file_name) -> str:
+    return re.sub(r"[^\w.\-]", "_", os.path.basename(file_name or "")) or "attachment.xlsx"
+
+def put_attachment(session, data: bytes, file_name: str) -> str:
+    """
+    Upload the raw attachment bytes to the internal stage once, uncompressed.
+    Returns the stage path to store in the ticket's UPLOAD column.
+    """
+    _ensure_stage(session)
+    location = f"@{ATTACHMENT_STAGE}/{uuid.uuid4().hex}/{safe_file_name(file_name)}"
+    session.file.put_stream(io.BytesIO(data), location, auto_compress=False, overwrite=False)
+    return location
+
+def read_attachment(session, upload_value):
+    """
+    Resolve an UPLOAD value to (bytes, file_name). Stage references are downloaded from the
+    stage; older rows still hold the base64 text, which is decoded (file_name is None then).
+    Returns (None, None) when there is no file.
+    """
+    missing = upload_value is None or (isinstance(upload_value, float) and math.isnan(upload_value))
+    if missing or upload_value in ("", "[NULL]"):
+        return None, None
+    if is_stage_reference(upload_value):
+        return session.file.get_stream(upload_value).read(), upload_value.rsplit("/", 1)[-1]
+    return base64.b64decode(upload_value), None
+
+class AttachmentCache:
+    """
+    Process-wide LRU cache of resolved attachments, bounded by total bytes.
+    Keys are (ticket ID, content version) so a replaced file is never served stale;
+    entries larger than the whole budget are returned but not kept.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, loader):
+        """
+        Return the cached (bytes, file_name) for key, calling loader() on a miss.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+        entry = loader()
+        size = len(entry[0] or b"")
+        if size <= self.max_bytes:
+            with self._lock:
+                if key not in self._entries:
+                    self._entries[key] = entry
+                    self.size_bytes += size
+                while self.size_bytes > self.max_bytes:
+                    _, (evicted, _) = self._entries.popitem(last=False)
+                    self.size_bytes -= len(evicted or b"")
+                    self.evictions += 1
+        return entry
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "size_bytes": self.size_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+# Module-level instance shared by every PM session in the process.
+attachment_cache = AttachmentCache()
@@ -0,0 +1,187 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+import ListTk
+import tk
+from ticket_index import FilterIndex
+from ticket_schema import FUNCTION_OPTIONS, PROJECT_STATUS_OPTIONS, REQUEST_TYPE_OPTIONS
+from ticket_store import LocalTicketStore
+
+######################
+# SYNTHETIC DATA
+######################
+
+# Relative frequency of each option; functions follow a rough Zipf curve over FUNCTION_OPTIONS.
+FUNCTION_WEIGHTS = 1 / np.arange(1, len(FUNCTION_OPTIONS) + 1)
+REQUEST_TYPE_WEIGHTS = [0.5, 0.2, 0.15, 0.15]
+PROJECT_STATUS_WEIGHTS = [0.1, 0.2, 0.1, 0.6]
+ASSIGNEES = ["Alex Kim", "Sam Patel", "Jordan Lee", "Riley Chen", "Casey Diaz", "Morgan Wu", "Taylor Ross", "Jamie Fox"]
+
+# Columns written for each generated ticket: tk.INSERT_COLS plus the fields the PM UI maintains.
+GENERATED_COLS = tk.INSERT_COLS + [
+    "DATE_CREATED", "DATE_COMPLETED", "ETC", "ASSIGNED_NAME", "ASSIGNED", "PROJECT_STATUS", "COMMENTS"
+]
+
+def _weighted(rng, options, weights, size):
+    weights = np.asarray(weights, dtype=float)
+    return rng.choice(np.asarray(options, dtype=object), size=size, p=weights / weights.sum())
+
+def generate_tickets(store, n: int, attachment_fraction: float = 0.0, attachment_bytes: int = 1_000_000,
+                     seed: int = 0, chunk_rows: int = 10_000):
+    """
+    Insert n synthetic tickets into `store`. Submission fields go through tk.ticket_row (so region,
+    segment and data manager follow the real rules); status, assignee and dates are drawn from
+    fixed distributions, and `attachment_fraction` of the tickets get an attachment of about
+    `attachment_bytes` random bytes.
+    """
+    rng = np.random.default_rng(seed)
+    for start in range(0, n, chunk_rows):
+        size = min(chunk_rows, n - start)
+        functions = _weighted(rng, FUNCTION_OPTIONS, FUNCTION_WEIGHTS, size)
+        request_types = _weighted(rng, REQUEST_TYPE_OPTIONS, REQUEST_TYPE_WEIGHTS, size)
+        statuses = _weighted(rng, PROJECT_STATUS_OPTIONS, PROJECT_STATUS_WEIGHTS, size)
+        created = pd.Timestamp("2022-01-01") + pd.to_timedelta(rng.integers(0, 3 * 365, size), unit="D")
+        completed = created + pd.to_timedelta(rng.gamma(2.0, 7.0, size).astype(int), unit="D")
+        etc = created + pd.to_timedelta(rng.integers(3, 60, size), unit="D")
+        has_file = rng.random(size) < attachment_fraction
+        rows = []
+        for i in range(size):
+            attachment = None
+            if has_file[i]:
+                data = rng.bytes(int(attachment_bytes * rng.uniform(0.5, 1.5)))
+                attachment = store.put_attachment(data, f"request_{start + i}.xlsx")
+            row = tk.ticket_row(functions[i], f"user{rng.integers(0, 5000)}@adiglobal.com", request_types[i],
+                                f"Request {start + i}", f"Details for request {start + i}", attachment)
+            status = statuses[i]
+            assignee = ASSIGNEES[rng.integers(0, len(ASSIGNEES))] if status != "Not Assigned" else None
+            rows.append(row + [
+                str(created[i].date()),
+                str(completed[i].date()) if status == "Completed" else None,
+                str(etc[i].date()) if status != "Not Assigned" else None,
+                assignee,
+                "Y" if assignee else "N",
+                status,
+                f"Follow-up note {start + i}" if rng.random() < 0.3 else None,
+            ])
+        store.insert_rows(GENERATED_COLS, rows)
+
+######################
+# BENCHMARKS
+######################
+
+def measure(name: str, store, setup, run, repeat: int) -> dict:
+    """
+    Time run(*setup()) `repeat` times; setup is not timed. Peak memory is the largest
+    tracemalloc peak of a single run, and SQL statements are those issued by the last run.
+    """
+    times, peaks, statements = [], [], 0
+    for _ in range(repeat):
+        args = setup()
+        tracemalloc.start()
+        before = store.statements
+        start = time.perf_counter()
+        run(*args)
+        times.append(time.perf_counter() - start)
+        statements = store.statements - before
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return {
+        "name": name,
+        "repeat": repeat,
+        "wall_seconds_median": statistics.median(times),
+        "wall_seconds_min": min(times),
+        "peak_bytes": max(peaks),
+        "sql_statements": statements,
+    }
+
+def _edited(frame: pd.DataFrame, fraction: float, token: int) -> pd.DataFrame:
+    """
+    Copy of frame with COMMENTS changed on `fraction` of its rows and every tenth of those marked Completed.
+    """
+    edited = frame.copy()
+    count = max(1, int(len(frame) * fraction))
+    positions = np.linspace(0, len(frame) - 1, count).astype(int)
+    edited["COMMENTS"] = edited["COMMENTS"].astype(object)
+    edited.iloc[positions, edited.columns.get_loc("COMMENTS")] = f"edit {token}"
+    edited.iloc[positions[::10], edited.columns.get_loc("PROJECT_STATUS")] = "Completed"
+    return edited
+
+def run_benchmarks(store, repeat: int = 5, edit_fraction: float = 0.01) -> list:
+    results = []
+    results.append(measure("fetch_tickets", store, lambda: (store,), ListTk.fetch_tickets, repeat))
+
+    frame = ListTk.fetch_tickets(store)
+    index = FilterIndex.build(frame)
+    filters = ("NA", "All", "All", "Report Request", "Completed")
+    results.append(measure("apply_filters", store, lambda: (frame, *filters),
+                           ListTk.apply_filters, repeat))
+    results.append(measure("apply_filters_indexed", store, lambda: (frame, *filters),
+                           lambda *args: ListTk.apply_filters(*args, index=index), repeat))
+
+    filtered = ListTk.apply_filters(frame, *filters, index=index)
+    results.append(measure("merge_filtered_edits", store,
+                           lambda: (frame, filtered, _edited(filtered, 0.1, 0)),
+                           ListTk.merge_filtered_edits, repeat))
+
+    tokens = iter(range(1, repeat + 1))
+    def diff_setup():
+        old = ListTk.fetch_tickets(store)
+        return store, old, _edited(old, edit_fraction, next(tokens))
+    results.append(measure("apply_diffs_and_update", store, diff_setup, ListTk.apply_diffs_and_update, repeat))
+
+    results.append(measure("insert_ticket", store,
+                           lambda: (store, "Snap DX", "bench@adiglobal.com", "Report Request", "Bench title", "Bench name"),
+                           tk.insert_ticket, repeat))
+    return results
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the ticket apps against the local SQLite store.")
+    parser.add_argument("--rows", type=int, default=10_000, help="synthetic tickets to generate (1k-1M)")
+    parser.add_argument("--attachment-fraction", type=float, default=0.0, help="share of tickets with an attachment")
+    parser.add_argument("--attachment-bytes", type=int, default=1_000_000, help="average attachment size")
+    parser.add_argument("--edit-fraction", type=float, default=0.01, help="share of rows edited per Apply")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--db", help="SQLite file to use (default: a new temporary file)")
+    parser.add_argument("--out", help="write the JSON results here instead of stdout")
+    args = parser.parse_args(argv)
+
+    path = args.db or os.path.join(tempfile.mkdtemp(prefix="ticket_bench_"), "tickets.db")
+    store = LocalTicketStore(path)
+    start = time.perf_counter()
+    generate_tickets(store, args.rows, args.attachment_fraction, args.attachment_bytes, args.seed)
+    report = {
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "config": {**vars(args), "db": path},
+        "generate_seconds": time.perf_counter() - start,
+        "results": run_benchmarks(store, args.repeat, args.edit_fraction),
+    }
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as handle:
+            handle.write(text + "\n")
+    else:
+        print(text)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,331 @@
+import logging
+import os
+import threading
+import time
+from collections import namedtuple
+
+import pandas as pd
+
+from snapshot_store import default_store
+from ticket_index import FilterIndex, align_categoricals, concat_categoricals
+from ticket_store import store_source
+
+######################
+# SHARED TICKET SNAPSHOT
+######################
+
+logger = logging.getLogger(__name__)
+
+# Seconds a snapshot may be served before it is reloaded (override with TICKET_CACHE_TTL).
+DEFAULT_TTL_SECONDS = float(os.environ.get("TICKET_CACHE_TTL", "60"))
+# Seconds between full reloads (override with TICKET_CACHE_RESYNC). Deltas cannot see rows deleted
+# by other writers, nor (on tables without MODIFIED_COL) their edits; this bounds how long those
+# stay invisible. Every other refresh is a delta.
+DEFAULT_RESYNC_SECONDS = float(os.environ.get("TICKET_CACHE_RESYNC", "900"))
+
+# One immutable view of the ticket table. `frame` is shared by every session, ordered by ID, and
+# must not be modified in place; `filter_index` answers the filter selectboxes for it. `version` is
+# the cache version it was loaded under, `loaded_at` the last refresh and `synced_at` the last full reload.
+# `derived` memoizes structures computed from the frame: lazily (see derive()), or while the snapshot
+# is produced for those registered with SnapshotCache.prebuild(). Values with an
+# updated(old_frame, rows, deleted_ids) method are carried across delta refreshes instead of rebuilt.
+TicketSnapshot = namedtuple("TicketSnapshot", ["frame", "filter_index", "version", "loaded_at", "synced_at", "derived"])
+
+# Progress of the full load in flight: rows streamed so far and the first batch (for a preview).
+LoadProgress = namedtuple("LoadProgress", ["rows", "first_batch"])
+
+def derive(snapshot: TicketSnapshot, name: str, build):
+    """
+    Return build(snapshot.frame), computed once per snapshot and shared by every session.
+    """
+    value = snapshot.derived.get(name)
+    if value is None:
+        value = build(snapshot.frame)
+        snapshot.derived[name] = value
+    return value
+
+def upsert_rows(frame: pd.DataFrame, rows: pd.DataFrame, deleted_ids=(), key: str = "ID") -> pd.DataFrame:
+    """
+    Return a new frame with `rows` replacing (or added to) the rows of `frame` with the same key,
+    and `deleted_ids` removed. The result is ordered by key.
+    """
+    frame, rows = align_categoricals(frame, rows[frame.columns])
+    drop = frame[key].isin(rows[key]) | frame[key].isin(list(deleted_ids))
+    merged = pd.concat([frame[~drop], rows], ignore_index=True)
+    return merged.sort_values(key, ignore_index=True)
+
+def build_snapshot_frame(result, on_batch=None):
+    """
+    Turn a full-load result into (frame ordered by ID, FilterIndex). `result` is either a
+    DataFrame or an iterable of DataFrame batches in ID order; batches are indexed as they
+    arrive and on_batch(batch, rows_so_far) is called after each one.
+    """
+    if isinstance(result, pd.DataFrame):
+        frame = result.sort_values("ID", ignore_index=True)
+        return frame, FilterIndex.build(frame)
+    batches, filter_index, rows = [], None, 0
+    for batch in result:
+        batch_index = FilterIndex.build(batch)
+        filter_index = batch_index if filter_index is None else filter_index.merged(batch_index)
+        batches.append(batch)
+        rows += len(batch)
+        if on_batch is not None:
+            on_batch(batch, rows)
+    if not batches:
+        raise ValueError("Ticket loader returned no batches")
+    return concat_categoricals(batches), filter_index
+
+class SnapshotCache:
+    """
+    Process-wide, TTL-bounded cache of the ticket table.
+    Every PM session reads the same snapshot; a write bumps the version via invalidate(),
+    which makes the current snapshot stale immediately. Only one loader runs at a time,
+    so concurrent reruns after an invalidation trigger a single fetch.
+
+    A stale snapshot is refreshed incrementally when a delta loader is given: it is asked
+    for the rows changed since the snapshot (plus the IDs reported to invalidate()), which
+    are upserted by ID. A full reload happens on the first load, after resync(), when the
+    delta loader returns None (e.g. the table schema changed), and once the last full reload
+    is older than resync_seconds.
+
+    With a `store` (see snapshot_store.DiskSnapshotStore) the snapshot is shared by every
+    process on the host: one of them refreshes from the warehouse and the rest map its file.
+
+    Derived values registered with prebuild() are built by whoever produces a snapshot (in the
+    apps, the refresher thread), so no session pays for them when it first reads the snapshot.
+    """
+
+    def __init__(self, ttl_seconds: float = DEFAULT_TTL_SECONDS, store=None,
+                 resync_seconds: float = DEFAULT_RESYNC_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self.resync_seconds = resync_seconds
+        self.store = store
+        self.hits = 0
+        self.misses = 0
+        self.full_loads = 0
+        self.delta_loads = 0
+        self.shared_loads = 0
+        self._version = 0
+        self._store_version = None
+        self._invalidated_at = 0.0
+        self._snapshot = None
+        # LoadProgress while a full load runs, else None; read by callers waiting for the first snapshot.
+        self.loading = None
+        self._dirty_ids = set()
+        self._deleted_ids = set()
+        self._resync = False
+        self._prebuilt = {}
+        self._load_lock = threading.Lock()
+        self._state_lock = threading.Lock()
+        self._stale = threading.Event()
+
+    def prebuild(self, name: str, build):
+        """
+        Build derived value `name` as build(frame) for every snapshot this cache produces, instead of
+        on first use through derive(). Takes effect from the next refresh.
+        """
+        self._prebuilt[name] = build
+
+    def _derived(self, frame: pd.DataFrame, carried=None) -> dict:
+        derived = dict(carried or {})
+        for name, build in list(self._prebuilt.items()):
+            if name not in derived:
+                derived[name] = build(frame)
+        return derived
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def _is_fresh(self, snapshot) -> bool:
+        return (
+            snapshot is not None
+            and snapshot.version == self._version
+            and time.time() - snapshot.loaded_at < self.ttl_seconds
+        )
+
+    def peek(self):
+        """
+        The latest snapshot, fresh or not, without loading anything (None before the first load).
+        """
+        return self._snapshot
+
+    def wait_until_stale(self, timeout: float = None):
+        """
+        Block until the current snapshot is stale (TTL expired, invalidate() or resync()),
+        or until `timeout` seconds pass. Returns immediately when there is no snapshot yet.
+        """
+        snapshot = self._snapshot
+        remaining = snapshot.loaded_at + self.ttl_seconds - time.time() if snapshot else 0
+        if timeout is not None:
+            remaining = min(remaining, timeout)
+        self._stale.wait(max(remaining, 0))
+
+    def _hit(self, snapshot) -> TicketSnapshot:
+        with self._state_lock:
+            self.hits += 1
+        return snapshot
+
+    def get(self, loader, delta_loader=None, on_batch=None) -> TicketSnapshot:
+        """
+        Return the current snapshot, refreshing it if it is missing or stale.
+        loader() returns the full table, as one DataFrame or as an iterable of batches in ID
+        order (see build_snapshot_frame; on_batch reports progress of a streamed load, and runs
+        under the cache's locks, so it must not render UI or block; see also `loading`).
+        The filter index is built from it and then kept up to date from each delta.
+        delta_loader(snapshot, ids) -> DataFrame | None returns the rows added or modified since
+        `snapshot` together with the rows in `ids`, or None to request a full reload.
+
+        With a shared store, a stale snapshot is first replaced by the store's file when another
+        process published one recently enough; otherwise this process refreshes under the
+        store's lock and publishes the result for the others.
+        """
+        snapshot = self._snapshot
+        if self._is_fresh(snapshot):
+            return self._hit(snapshot)
+        with self._load_lock:
+            # Another session may have reloaded while we waited for the lock.
+            snapshot = self._snapshot
+            if self._is_fresh(snapshot):
+                return self._hit(snapshot)
+            self._stale.clear()
+            if self.store is None:
+                snapshot = self._refresh(snapshot, loader, delta_loader, on_batch)
+            else:
+                shared = self._adopt_shared()
+                if shared is None:
+                    with self.store.lock():
+                        # The process holding the lock before us may just have published.
+                        shared = self._adopt_shared()
+                        if shared is None:
+                            started_at = time.time()
+                            shared = self._publish(self._refresh(snapshot, loader, delta_loader, on_batch), started_at)
+                snapshot = shared
+            self._snapshot = snapshot
+            return snapshot
+
+    def _sync_due(self, snapshot) -> bool:
+        return time.time() - snapshot.synced_at >= self.resync_seconds
+
+    def _refresh(self, snapshot, loader, delta_loader, on_batch) -> TicketSnapshot:
+        with self._state_lock:
+            self.misses += 1
+            version = self._version
+            dirty_ids, deleted_ids = self._dirty_ids, self._deleted_ids
+            self._dirty_ids, self._deleted_ids = set(), set()
+            full = self._resync or snapshot is None or delta_loader is None or self._sync_due(snapshot)
+            self._resync = False
+        # A write that lands during the load bumps the version, so this snapshot is stale on arrival.
+        try:
+            rows = None if full else delta_loader(snapshot, dirty_ids)
+            now = time.time()
+            if rows is None:
+                frame, filter_index = self._full_load(loader, on_batch)
+                self.full_loads += 1
+                return TicketSnapshot(frame, filter_index, version, now, now, self._derived(frame))
+            frame = upsert_rows(snapshot.frame, rows, deleted_ids)
+            filter_index = snapshot.filter_index.updated(snapshot.frame, rows, deleted_ids)
+            self.delta_loads += 1
+            derived = self._derived(frame, {
+                name: value.updated(snapshot.frame, rows, deleted_ids)
+                for name, value in snapshot.derived.items()
+                if hasattr(value, "updated")
+            })
+            return TicketSnapshot(frame, filter_index, version, now, snapshot.synced_at, derived)
+        except Exception:
+            with self._state_lock:
+                self._dirty_ids |= dirty_ids
+                self._deleted_ids |= deleted_ids
+                self._resync = self._resync or full
+            raise
+
+    def _full_load(self, loader, on_batch):
+        def record(batch, rows_so_far):
+            first_batch = self.loading.first_batch if self.loading.first_batch is not None else batch
+            self.loading = LoadProgress(rows_so_far, first_batch)
+            if on_batch is not None:
+                on_batch(batch, rows_so_far)
+        self.loading = LoadProgress(0, None)
+        try:
+            return build_snapshot_frame(loader(), record)
+        finally:
+            self.loading = None
+
+    def _adopt_shared(self):
+        """
+        Snapshot mapped from the store's current file, or None if this process has to refresh:
+        nothing published yet, the file is what we already hold or older than the TTL, a resync
+        was requested, or the refresh behind it began before this process's last write.
+        """
+        info = self.store.current()
+        with self._state_lock:
+            if (
+                info is None
+                or info.version == self._store_version
+                or self._resync
+                or info.started_at <= self._invalidated_at
+                or time.time() - info.written_at >= self.ttl_seconds
+            ):
+                return None
+            version = self._version
+        frame = self.store.read(info)
+        filter_index, derived = FilterIndex.build(frame), self._derived(frame)
+        with self._state_lock:
+            # Pending IDs were all written before the refresh behind this file started.
+            if info.started_at > self._invalidated_at:
+                self._dirty_ids, self._deleted_ids = set(), set()
+            self._store_version = info.version
+            self.shared_loads += 1
+        return TicketSnapshot(frame, filter_index, version, info.written_at, info.synced_at, derived)
+
+    def _publish(self, snapshot: TicketSnapshot, started_at: float) -> TicketSnapshot:
+        """
+        Write a freshly refreshed snapshot to the store and serve it from the mapped file,
+        so this process shares the page-cache copy with the others.
+        """
+        try:
+            info = self.store.write(snapshot.frame, started_at, snapshot.synced_at)
+            frame = self.store.read(info)
+        except OSError as e:
+            logger.warning("Could not publish the ticket snapshot to %s: %s", self.store.directory, e)
+            return snapshot
+        self._store_version = info.version
+        return snapshot._replace(frame=frame)
+
+    def invalidate(self, ids=(), deleted_ids=()):
+        """
+        Mark the current snapshot stale. Call after every write this process commits to the ticket
+        table, passing the IDs that were updated or deleted so the next refresh can pick them up.
+        Other processes' writes (e.g. the ticket form's inserts) surface within ttl_seconds instead.
+        """
+        with self._state_lock:
+            self._version += 1
+            self._invalidated_at = time.time()
+            self._dirty_ids.update(int(i) for i in ids)
+            self._deleted_ids.update(int(i) for i in deleted_ids)
+        self._stale.set()
+
+    def resync(self):
+        """
+        Force a full reload on the next get().
+        """
+        with self._state_lock:
+            self._version += 1
+            self._resync = True
+        self._stale.set()
+
+    def stats(self) -> dict:
+        snapshot = self._snapshot
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "full_loads": self.full_loads,
+            "delta_loads": self.delta_loads,
+            "shared_loads": self.shared_loads,
+            "store_version": self._store_version,
+            "version": self._version,
+            "age_seconds": time.time() - snapshot.loaded_at if snapshot else None,
+        }
+
+# Module-level instance: the module is imported once per process, so it outlives script reruns.
+snapshot_cache = SnapshotCache(store=default_store(store_source()))
@@ -0,0 +1,125 @@
+import numpy as np
+import pandas as pd
+from collections import namedtuple
+
+######################
+# ID-KEYED DIFF
+######################
+
+# Result of comparing two ticket frames:
+#   changes     - DataFrame with columns ID, COLUMN, OLD, NEW (one row per changed cell)
+#   added       - DataFrame of rows present only in the new frame (ID may be missing)
+#   deleted_ids - list of IDs present only in the old frame
+ChangeSet = namedtuple("ChangeSet", ["changes", "added", "deleted_ids"])
+
+CHANGE_COLS = ["ID", "COLUMN", "OLD", "NEW"]
+
+def empty_changes() -> pd.DataFrame:
+    return pd.DataFrame({c: pd.Series(dtype=object) for c in CHANGE_COLS})
+
+def change_mask(old_values: np.ndarray, new_values: np.ndarray) -> np.ndarray:
+    """
+    Element-wise "value changed" mask for two aligned 2-D object arrays.
+    Missing values (None, NaN, NaT, pd.NA) compare equal to each other.
+    """
+    old_na = pd.isna(old_values)
+    new_na = pd.isna(new_values)
+    # Blank out missing values so NaN != NaN and pd.NA comparisons don't leak into the result.
+    old_cmp = np.where(old_na, None, old_values)
+    new_cmp = np.where(new_na, None, new_values)
+    return (old_na != new_na) | (~old_na & ~new_na & (old_cmp != new_cmp))
+
+def diff_frames(old_df: pd.DataFrame, new_df: pd.DataFrame, columns, key: str = "ID") -> ChangeSet:
+    """
+    Compare old_df and new_df aligned on `key` (not on position).
+    Only `columns` present in both frames are compared; all of them are compared at once.
+    Rows of new_df with a missing or unknown key are reported as added,
+    keys of old_df that no longer appear in new_df as deleted.
+    """
+    has_key = new_df[key].notna()
+    old_keyed = old_df.set_index(key)
+    new_keyed = new_df[has_key].set_index(key)
+
+    known = new_keyed.index.isin(old_keyed.index)
+    added = pd.concat([new_df[~has_key], new_df[has_key][~known]])
+    deleted_ids = old_keyed.index[~old_keyed.index.isin(new_keyed.index)].tolist()
+
+    common = new_keyed.index[known]
+    cols = [c for c in columns if c in old_keyed.columns and c in new_keyed.columns]
+    if len(common) == 0 or not cols:
+        return ChangeSet(empty_changes(), added, deleted_ids)
+
+    old_values = old_keyed.loc[common, cols].to_numpy(dtype=object)
+    new_values = new_keyed.loc[common, cols].to_numpy(dtype=object)
+    rows, col_idx = np.nonzero(change_mask(old_values, new_values))
+    changes = pd.DataFrame({
+        "ID": common.to_numpy()[rows],
+        "COLUMN": np.asarray(cols, dtype=object)[col_idx],
+        "OLD": old_values[rows, col_idx],
+        "NEW": new_values[rows, col_idx],
+    })
+    return ChangeSet(changes, added, deleted_ids)
+
+def apply_change_set(df: pd.DataFrame, change_set: ChangeSet, key: str = "ID") -> pd.DataFrame:
+    """
+    Return a copy of df with the change set applied: changed cells written
+    column by column, added rows appended and deleted IDs dropped.
+    """
+    merged = df.set_index(key)
+    changes = change_set.changes
+    for column, group in changes.groupby("COLUMN", sort=False):
+        if column not in merged.columns:
+            continue
+        if merged[column].dtype != object and not isinstance(merged[column].dtype, pd.CategoricalDtype):
+            merged[column] = merged[column].astype(object)
+        merged.loc[group["ID"].to_numpy(), column] = group["NEW"].to_numpy()
+    if change_set.deleted_ids:
+        merged = merged.drop(index=change_set.deleted_ids, errors="ignore")
+    merged = merged.reset_index()
+    if not change_set.added.empty:
+        merged = pd.concat([merged, change_set.added[[c for c in merged.columns if c in change_set.added.columns]]],
+                           ignore_index=True)
+        # Added rows have no ID yet; keep the key integral instead of letting NaN turn it into float.
+        merged[key] = merged[key].astype("Int64")
+    return merged
+
+######################
+# EDITOR DELTA
+######################
+
+def has_pending_edits(delta) -> bool:
+    """
+    True if an st.data_editor delta (see change_set_from_editor) holds any edited, added or deleted row.
+    """
+    return bool(delta) and any(delta.get(part) for part in ("edited_rows", "added_rows", "deleted_rows"))
+
+def change_set_from_editor(delta, view_ids, base: pd.DataFrame, key: str = "ID") -> ChangeSet:
+    """
+    Build a ChangeSet from the sparse state st.data_editor keeps under its key
+    ({"edited_rows": {pos: {col: val}}, "added_rows": [...], "deleted_rows": [pos]}).
+    `view_ids` are the IDs of the rows in the order they were handed to the editor,
+    used to map positional row indices back to tickets; `base` supplies the OLD values.
+    Work is proportional to the number of edited cells, not the size of `base`.
+    """
+    delta = delta or {}
+    view_ids = np.asarray(view_ids)
+    records = []
+    for pos, row_edits in (delta.get("edited_rows") or {}).items():
+        row_id = view_ids[int(pos)]
+        for column, new_val in row_edits.items():
+            records.append((row_id, column, new_val))
+    changes = empty_changes()
+    if records:
+        edits = pd.DataFrame.from_records(records, columns=["ID", "COLUMN", "NEW"])
+        edits = edits[edits["COLUMN"].isin(base.columns)]
+        rows = pd.Index(base[key]).get_indexer(edits["ID"].to_numpy())
+        old_values = np.empty(len(edits), dtype=object)
+        for column, positions in edits.groupby("COLUMN", sort=False).indices.items():
+            old_values[positions] = base[column].to_numpy(dtype=object)[rows[positions]]
+        edits["OLD"] = np.where(rows >= 0, old_values, None)
+        changed = change_mask(edits[["OLD"]].to_numpy(dtype=object), edits[["NEW"]].to_numpy(dtype=object))[:, 0]
+        changes = edits.loc[changed, CHANGE_COLS].reset_index(drop=True)
+
+    added = pd.DataFrame.from_records(list(delta.get("added_rows") or []))
+    deleted_ids = [int(view_ids[int(pos)]) for pos in delta.get("deleted_rows") or []]
+    return ChangeSet(changes, added, deleted_ids)
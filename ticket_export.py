@@ -0,0 +1,154 @@
+import os
+import tempfile
+from collections import namedtuple
+
+import pandas as pd
+import pyarrow as pa
+
+######################
+# CHUNKED EXPORT
+######################
+
+# Rows converted and written per chunk; memory use is bounded by one chunk, not the export size.
+CHUNK_ROWS = 20_000
+# Rows per Excel sheet (including the header row).
+XLSX_MAX_ROWS = 1_048_576
+
+# Download formats: label -> (file extension, MIME type).
+EXPORT_FORMATS = {
+    "Parquet": ("parquet", "application/vnd.apache.parquet"),
+    "CSV": ("csv", "text/csv"),
+    "Excel": ("xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+}
+
+# A finished export on disk: `path` is a temporary file owned by the caller.
+ExportFile = namedtuple("ExportFile", ["path", "file_name", "mime", "rows", "size_bytes"])
+
+def frame_chunks(frame: pd.DataFrame, columns, chunk_rows: int = CHUNK_ROWS):
+    """
+    Consecutive row slices of frame[columns]; each slice is converted on its own, so no
+    second full copy of the view is built.
+    """
+    for start in range(0, len(frame), chunk_rows):
+        yield frame.iloc[start:start + chunk_rows][columns]
+
+def query_chunks(store, columns, filters: dict, chunk_rows: int = CHUNK_ROWS):
+    """
+    All tickets matching `filters`, pushed down to the store and read one keyset page
+    (ordered by ID) at a time.
+    """
+    after_id = None
+    while True:
+        page = store.fetch(columns, filters, after_id, limit=chunk_rows)
+        if page.empty:
+            return
+        yield page[[c for c in columns if c in page.columns]]
+        if len(page) < chunk_rows:
+            return
+        after_id = int(page["ID"].iloc[-1])
+
+def _export_type(arrow_type: pa.DataType) -> pa.DataType:
+    # Chunks of one export may come from differently sized pages (int8 vs int16 IDs, categories
+    # vs strings), so every chunk is cast to the same plain types.
+    if pa.types.is_integer(arrow_type):
+        return pa.int64()
+    if pa.types.is_timestamp(arrow_type) or pa.types.is_date(arrow_type):
+        return pa.date32()  # the ticket dates carry no time of day
+    return pa.string()
+
+def _arrow_chunk(chunk: pd.DataFrame, schema):
+    table = pa.Table.from_pandas(chunk, preserve_index=False)
+    if schema is None:
+        schema = pa.schema([pa.field(f.name, _export_type(f.type)) for f in table.schema])
+    return table.cast(schema, safe=False), schema
+
+class _ArrowWriter:
+    """
+    Parquet or CSV output through pyarrow's incremental writers, opened on the first chunk.
+    """
+
+    def __init__(self, path: str, extension: str):
+        self.path, self.extension = path, extension
+        self._writer = None
+
+    def _open(self, schema):
+        if self.extension == "parquet":
+            import pyarrow.parquet as pq
+            self._writer = pq.ParquetWriter(self.path, schema, compression="zstd")
+        else:
+            import pyarrow.csv as pcsv
+            self._writer = pcsv.CSVWriter(self.path, schema)
+
+    def write(self, table: pa.Table):
+        if self._writer is None:
+            self._open(table.schema)
+        self._writer.write_table(table)
+
+    def close(self, schema):
+        if self._writer is None:
+            self._open(schema)
+        self._writer.close()
+
+class _XlsxWriter:
+    """
+    Excel output through xlsxwriter's constant-memory mode, which flushes each row to disk
+    as soon as the next one starts.
+    """
+
+    def __init__(self, path: str, extension: str = "xlsx"):
+        import xlsxwriter
+        self._book = xlsxwriter.Workbook(path, {"constant_memory": True, "default_date_format": "yyyy-mm-dd"})
+        self._sheet = self._book.add_worksheet("Tickets")
+        self._row = 0
+
+    def _header(self, schema):
+        if self._row == 0:
+            self._sheet.write_row(0, 0, schema.names)
+            self._row = 1
+
+    def write(self, table: pa.Table):
+        self._header(table.schema)
+        if self._row + table.num_rows > XLSX_MAX_ROWS:
+            raise ValueError(f"Excel sheets hold at most {XLSX_MAX_ROWS - 1:,} rows; export as Parquet or CSV instead.")
+        for values in zip(*(column.to_pylist() for column in table.columns)):
+            self._sheet.write_row(self._row, 0, values)
+            self._row += 1
+
+    def close(self, schema):
+        self._header(schema)
+        self._book.close()
+
+WRITERS = {"parquet": _ArrowWriter, "csv": _ArrowWriter, "xlsx": _XlsxWriter}
+
+def export_chunks(chunks, columns, fmt: str, file_stem: str = "tickets", directory: str = None) -> ExportFile:
+    """
+    Write the frames yielded by `chunks` to a temporary file in format `fmt` (a key of
+    EXPORT_FORMATS), converting and writing one chunk at a time. The caller removes the file.
+    """
+    extension, mime = EXPORT_FORMATS[fmt]
+    handle, path = tempfile.mkstemp(prefix=f"{file_stem}_", suffix=f".{extension}", dir=directory)
+    os.close(handle)
+    rows, schema = 0, None
+    try:
+        writer = WRITERS[extension](path, extension)
+        for chunk in chunks:
+            table, schema = _arrow_chunk(chunk, schema)
+            writer.write(table)
+            rows += table.num_rows
+        if schema is None:
+            schema = pa.schema([pa.field(c, pa.string()) for c in columns])
+        writer.close(schema)
+    except Exception:
+        os.remove(path)
+        raise
+    return ExportFile(path, f"{file_stem}.{extension}", mime, rows, os.path.getsize(path))
+
+def take_export(export: ExportFile) -> bytes:
+    """
+    Read a finished export and delete its file, so nothing is left on disk once it is served.
+    """
+    try:
+        with open(export.path, "rb") as handle:
+            return handle.read()
+    finally:
+        os.remove(export.path)
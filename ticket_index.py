@@ -0,0 +1,155 @@
+import numpy as np
+import pandas as pd
+
+######################
+# FILTER INDEX
+######################
+
+# Columns behind the five filter selectboxes, in apply_filters argument order.
+FILTER_COLS = ["REGION", "BUSINESS_SEGMENT", "FUNCTION_NAME", "REQUEST_TYPE", "PROJECT_STATUS"]
+
+EMPTY_IDS = np.array([], dtype=np.int64)
+
+def as_categoricals(frame: pd.DataFrame, categories: dict) -> pd.DataFrame:
+    """
+    Convert the columns in `categories` to pandas Categoricals. The known values come first,
+    followed by any other value found in the data, so nothing is lost to NaN.
+    """
+    converted = {}
+    for column, known in categories.items():
+        if column not in frame.columns:
+            continue
+        values = frame[column]
+        extra = [v for v in pd.unique(values.dropna()) if v not in set(known)]
+        converted[column] = pd.Categorical(values, categories=list(known) + extra)
+    return frame.assign(**converted)
+
+def align_categoricals(frame: pd.DataFrame, rows: pd.DataFrame):
+    """
+    Give `rows` the categorical dtypes of `frame`, extending the categories of both where
+    `rows` brings new values. Returns (frame, rows) ready to be concatenated.
+    """
+    frame_cols, row_cols = {}, {}
+    for column in frame.columns:
+        dtype = frame[column].dtype
+        if not isinstance(dtype, pd.CategoricalDtype) or column not in rows.columns:
+            continue
+        new_values = [v for v in pd.unique(rows[column].dropna()) if v not in dtype.categories]
+        if new_values:
+            frame_cols[column] = frame[column].cat.add_categories(new_values)
+            dtype = frame_cols[column].dtype
+        row_cols[column] = rows[column].astype(dtype)
+    return frame.assign(**frame_cols), rows.assign(**row_cols)
+
+def concat_categoricals(frames) -> pd.DataFrame:
+    """
+    Concatenate frames whose categorical columns may have different categories (e.g. one
+    per fetched batch) without falling back to object dtype.
+    """
+    first = frames[0]
+    categories = {
+        column: list(dict.fromkeys(v for f in frames for v in f[column].cat.categories))
+        for column in first.columns
+        if isinstance(first[column].dtype, pd.CategoricalDtype)
+    }
+    aligned = [
+        f.assign(**{column: f[column].cat.set_categories(cats) for column, cats in categories.items()})
+        for f in frames
+    ]
+    return pd.concat(aligned, ignore_index=True)
+
+class FilterIndex:
+    """
+    Sorted ticket-ID arrays for every value of each filter column, built once per snapshot.
+    Any combination of filter selections is answered by intersecting a few small arrays.
+    """
+
+    def __init__(self, ids_by_value: dict):
+        # {column: {value: sorted np.ndarray of IDs}}
+        self._ids = ids_by_value
+
+    @classmethod
+    def build(cls, frame: pd.DataFrame, columns=FILTER_COLS, key: str = "ID") -> "FilterIndex":
+        ids = frame[key].to_numpy()
+        ids_by_value = {}
+        for column in columns:
+            if column not in frame.columns:
+                continue
+            values = pd.Categorical(frame[column])
+            codes = values.codes
+            order = np.argsort(codes, kind="stable")
+            bounds = np.searchsorted(codes[order], np.arange(len(values.categories) + 1))
+            ids_by_value[column] = {
+                value: np.sort(ids[order[bounds[i]:bounds[i + 1]]])
+                for i, value in enumerate(values.categories)
+            }
+        return cls(ids_by_value)
+
+    def merged(self, other: "FilterIndex") -> "FilterIndex":
+        """
+        Combine with the index of a batch whose IDs all follow this one's (batches fetched in ID order).
+        """
+        ids_by_value = {}
+        for column in dict.fromkeys(list(self._ids) + list(other._ids)):
+            mine, theirs = self._ids.get(column, {}), other._ids.get(column, {})
+            ids_by_value[column] = {
+                value: np.concatenate([mine.get(value, EMPTY_IDS), theirs.get(value, EMPTY_IDS)])
+                for value in dict.fromkeys(list(mine) + list(theirs))
+            }
+        return FilterIndex(ids_by_value)
+
+    def select_ids(self, selections: dict):
+        """
+        Sorted IDs matching every selection ({column: value}, "All" = no restriction),
+        or None when nothing is restricted.
+        """
+        arrays = [
+            self._ids.get(column, {}).get(value, EMPTY_IDS)
+            for column, value in selections.items()
+            if value != "All"
+        ]
+        if not arrays:
+            return None
+        arrays.sort(key=len)
+        result = arrays[0]
+        for ids in arrays[1:]:
+            result = np.intersect1d(result, ids, assume_unique=True)
+        return result
+
+    def positions(self, frame: pd.DataFrame, selections: dict, ids=None, key: str = "ID"):
+        """
+        Row positions in `frame` (sorted by key) matching `selections` and, if given, among the
+        sorted `ids` (e.g. search results). None when nothing is restricted.
+        """
+        selected = self.select_ids(selections)
+        if ids is not None:
+            selected = ids if selected is None else np.intersect1d(selected, ids, assume_unique=True)
+        if selected is None:
+            return None
+        return np.searchsorted(frame[key].to_numpy(), selected)
+
+    def updated(self, old_frame: pd.DataFrame, rows: pd.DataFrame, deleted_ids=(), key: str = "ID") -> "FilterIndex":
+        """
+        Return a new index reflecting `rows` upserted into `old_frame` (sorted by key) and
+        `deleted_ids` removed. Only the value arrays the touched tickets move between are rebuilt.
+        """
+        touched = np.union1d(rows[key].to_numpy(dtype=np.int64), np.asarray(list(deleted_ids), dtype=np.int64))
+        old_ids = old_frame[key].to_numpy()
+        pos = np.searchsorted(old_ids, touched)
+        found = pos < len(old_ids)
+        found[found] = old_ids[pos[found]] == touched[found]
+        pos = pos[found]
+        ids_by_value = {}
+        for column, by_value in self._ids.items():
+            by_value = dict(by_value)
+            previous = pd.Series(old_ids[pos]).groupby(old_frame[column].iloc[pos].to_numpy(dtype=object), dropna=True)
+            for value, ids in previous:
+                by_value[value] = np.setdiff1d(by_value.get(value, EMPTY_IDS), ids.to_numpy(), assume_unique=True)
+            if column in rows.columns:
+                current = pd.Series(rows[key].to_numpy(dtype=np.int64)).groupby(
+                    rows[column].to_numpy(dtype=object), dropna=True
+                )
+                for value, ids in current:
+                    by_value[value] = np.union1d(by_value.get(value, EMPTY_IDS), ids.to_numpy())
+            ids_by_value[column] = by_value
+        return FilterIndex(ids_by_value)
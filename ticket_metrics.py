@@ -0,0 +1,156 @@
+import contextlib
+import json
+import logging
+import sys
+import threading
+import time
+from collections import defaultdict, deque
+
+import streamlit as st
+
+######################
+# RERUN INSTRUMENTATION
+######################
+
+logger = logging.getLogger(__name__)
+
+# Prefix of the Snowflake QUERY_TAG; the full tag is "<prefix>/<app>/<phase>".
+QUERY_TAG_PREFIX = "ADI_TICKETS"
+# Recent durations kept per (app, phase) for the rolling percentiles.
+WINDOW = 500
+
+# Per-thread app/phase and the counters of the phase currently running on this thread.
+_context = threading.local()
+
+def query_tag() -> str:
+    """
+    QUERY_TAG for a statement issued now on this thread.
+    """
+    return f"{QUERY_TAG_PREFIX}/{getattr(_context, 'app', None) or 'unknown'}/{getattr(_context, 'phase', None) or 'none'}"
+
+def count_statement():
+    counters = getattr(_context, "counters", None)
+    if counters is not None:
+        counters["statements"] += 1
+
+def count_transfer(rows: int, nbytes: int):
+    counters = getattr(_context, "counters", None)
+    if counters is not None:
+        counters["rows"] += int(rows)
+        counters["bytes"] += int(nbytes)
+
+@contextlib.contextmanager
+def tagged(app: str, phase: str, counters: dict = None):
+    """
+    Attribute the statements issued on this thread inside the block to app/phase.
+    """
+    previous = (getattr(_context, "app", None), getattr(_context, "phase", None), getattr(_context, "counters", None))
+    _context.app, _context.phase, _context.counters = app, phase, counters
+    try:
+        yield
+    finally:
+        _context.app, _context.phase, _context.counters = previous
+
+class PhaseStats:
+    """
+    Process-wide rolling window of phase durations, for p50/p95 across all users.
+    """
+
+    def __init__(self, window: int = WINDOW):
+        self._durations = defaultdict(lambda: deque(maxlen=window))
+        self._lock = threading.Lock()
+
+    def add(self, app: str, phase: str, seconds: float):
+        with self._lock:
+            self._durations[(app, phase)].append(seconds)
+
+    def percentiles(self, app: str) -> list:
+        """
+        [{phase, count, p50_ms, p95_ms}] for one app, in first-seen order.
+        """
+        with self._lock:
+            windows = {phase: sorted(d) for (a, phase), d in self._durations.items() if a == app}
+        return [
+            {
+                "phase": phase,
+                "count": len(values),
+                "p50_ms": values[int(0.50 * (len(values) - 1))] * 1000,
+                "p95_ms": values[int(0.95 * (len(values) - 1))] * 1000,
+            }
+            for phase, values in windows.items()
+        ]
+
+phase_stats = PhaseStats()
+
+def session_state_bytes(state) -> int:
+    """
+    Approximate size of a Streamlit session state: frames by their deep memory usage,
+    arrays by nbytes, anything else by sys.getsizeof.
+    """
+    total = 0
+    for value in state.values():
+        if hasattr(value, "memory_usage") and hasattr(value, "columns"):
+            total += int(value.memory_usage(deep=True).sum())
+        elif hasattr(value, "nbytes"):
+            total += int(value.nbytes)
+        else:
+            total += sys.getsizeof(value)
+    return total
+
+class RerunMetrics:
+    """
+    Timings and statement/row/byte counts for the phases of one script rerun. Phases run
+    back to back: step(name) ends the current phase and starts the next one.
+    """
+
+    def __init__(self, app: str):
+        self.app = app
+        self.phases = []
+        self._start = time.perf_counter()
+        self._current = None
+
+    def step(self, name: str):
+        self._end_phase()
+        counters = {"statements": 0, "rows": 0, "bytes": 0}
+        self._current = (name, time.perf_counter(), counters)
+        _context.app, _context.phase, _context.counters = self.app, name, counters
+
+    def _end_phase(self):
+        if self._current is None:
+            return
+        name, start, counters = self._current
+        seconds = time.perf_counter() - start
+        self.phases.append({"phase": name, "ms": seconds * 1000, **counters})
+        phase_stats.add(self.app, name, seconds)
+        self._current = None
+        _context.app, _context.phase, _context.counters = None, None, None
+
+    def finish(self, state=None) -> dict:
+        """
+        Close the rerun and emit it as one structured (JSON) log record.
+        """
+        self._end_phase()
+        seconds = time.perf_counter() - self._start
+        phase_stats.add(self.app, "total", seconds)
+        record = {
+            "app": self.app,
+            "total_ms": seconds * 1000,
+            "statements": sum(p["statements"] for p in self.phases),
+            "phases": self.phases,
+            "session_state_bytes": session_state_bytes(state) if state is not None else None,
+        }
+        logger.info(json.dumps(record))
+        return record
+
+def show_debug_panel(record: dict):
+    """
+    Sidebar panel with this rerun's phases and the process-wide rolling percentiles.
+    """
+    with st.sidebar.expander("Performance", expanded=True):
+        st.caption(
+            f"Rerun {record['total_ms']:.0f} ms · {record['statements']} SQL statement(s) · "
+            f"session state {(record['session_state_bytes'] or 0) / 1e6:.1f} MB"
+        )
+        st.dataframe(record["phases"], hide_index=True, use_container_width=True)
+        st.caption("Rolling percentiles (all users)")
+        st.dataframe(phase_stats.percentiles(record["app"]), hide_index=True, use_container_width=True)
@@ -0,0 +1,179 @@
+import logging
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from collections import namedtuple
+from concurrent.futures import Future
+
+######################
+# WRITE-BEHIND SUBMISSIONS
+######################
+
+logger = logging.getLogger(__name__)
+
+# Flush as soon as this many tickets are pending...
+DEFAULT_MAX_BATCH = 50
+# ...or this long after the first pending ticket arrived.
+DEFAULT_MAX_DELAY_MS = 250
+# Pending tickets held in memory before submit() starts rejecting new ones...
+DEFAULT_MAX_PENDING = 1000
+# ...and their total attachment bytes (a ticket may carry up to MAX_ATTACHMENT_BYTES).
+DEFAULT_MAX_PENDING_BYTES = 200_000_000
+
+def new_receipt() -> str:
+    return uuid.uuid4().hex[:12].upper()
+
+def _causes(error: BaseException):
+    while error is not None:
+        yield error
+        error = error.__cause__ or error.__context__
+
+def is_transient(error: BaseException) -> bool:
+    """
+    Whether a failed flush is worth retrying: lost connections, timeouts and a busy local
+    database, including when a client library wraps them. SQL and data errors are not.
+    """
+    try:
+        from snowflake.connector.errors import InterfaceError, OperationalError
+        connector_errors = (InterfaceError, OperationalError)
+    except ImportError:
+        connector_errors = ()
+    for e in _causes(error):
+        if isinstance(e, (ConnectionError, TimeoutError) + connector_errors):
+            return True
+        if isinstance(e, sqlite3.OperationalError) and ("locked" in str(e) or "busy" in str(e)):
+            return True
+    return False
+
+# `receipt` is the acknowledgement shown to the submitter; `future` resolves once the
+# batch holding `item` is committed (or fails after all retries). `size` is the item's
+# byte count against the queue's byte budget.
+Submission = namedtuple("Submission", ["receipt", "item", "future", "size"])
+
+class SubmissionQueue:
+    """
+    Bounded in-process queue drained by one background worker. Pending items are coalesced
+    and handed to flush(items) every max_delay_ms or max_batch items, whichever comes first;
+    a flush failing with an error that `retryable(error)` accepts (is_transient by default) is
+    retried with exponential backoff, so flush must be idempotent: it should store each item's
+    receipt and skip items already stored. Submitters wait on Submission.future before
+    confirming; items still queued when the process exits are lost.
+    Pending items are bounded both by count and by total bytes (held until their batch
+    is flushed or dropped).
+    """
+
+    def __init__(self, flush, max_batch: int = DEFAULT_MAX_BATCH, max_delay_ms: int = DEFAULT_MAX_DELAY_MS,
+                 max_pending: int = DEFAULT_MAX_PENDING, max_pending_bytes: int = DEFAULT_MAX_PENDING_BYTES,
+                 max_retries: int = 3, backoff_seconds: float = 0.5, retryable=is_transient):
+        self.flush = flush
+        self.retryable = retryable
+        self.max_batch = max_batch
+        self.max_delay = max_delay_ms / 1000
+        self.max_pending_bytes = max_pending_bytes
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.submitted = 0
+        self.flushed = 0
+        self.failed = 0
+        self.batches = 0
+        self.last_flush_seconds = None
+        self.total_flush_seconds = 0.0
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._pending_bytes = 0
+        self._bytes_available = threading.Condition()
+        self._worker = threading.Thread(target=self._run, name="ticket-submissions", daemon=True)
+        self._worker.start()
+
+    def submit(self, item, size: int = 0, timeout: float = 1.0, receipt: str = None) -> Submission:
+        """
+        Enqueue one item of `size` bytes without waiting for the database. Raises queue.Full
+        if the queue stays full (by count or bytes) for `timeout` seconds. An item larger than
+        the whole byte budget is still accepted once nothing else is pending.
+        `receipt` defaults to new_receipt(); pass the key the flush stores with the item.
+        """
+        deadline = time.monotonic() + timeout
+        with self._bytes_available:
+            fits = lambda: self._pending_bytes == 0 or self._pending_bytes + size <= self.max_pending_bytes
+            if not self._bytes_available.wait_for(fits, timeout):
+                raise queue.Full
+            self._pending_bytes += size
+        submission = Submission(receipt or new_receipt(), item, Future(), size)
+        try:
+            self._queue.put(submission, timeout=max(0.0, deadline - time.monotonic()))
+        except queue.Full:
+            self._release([submission])
+            raise
+        self.submitted += 1
+        return submission
+
+    def _release(self, batch):
+        with self._bytes_available:
+            self._pending_bytes -= sum(s.size for s in batch)
+            self._bytes_available.notify_all()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._flush(batch)
+
+    def _flush(self, batch):
+        start = time.perf_counter()
+        for attempt in range(self.max_retries + 1):
+            try:
+                self.flush([s.item for s in batch])
+            except Exception as e:
+                if attempt == self.max_retries or not self.retryable(e):
+                    logger.error("Dropping %d ticket submission(s) after %d attempts: %s", len(batch), attempt + 1, e)
+                    self.failed += len(batch)
+                    self._release(batch)
+                    for s in batch:
+                        s.future.set_exception(e)
+                    return
+                logger.warning("Ticket submission flush failed (attempt %d), retrying: %s", attempt + 1, e)
+                time.sleep(self.backoff_seconds * 2 ** attempt)
+            else:
+                break
+        elapsed = time.perf_counter() - start
+        self.batches += 1
+        self.flushed += len(batch)
+        self.last_flush_seconds = elapsed
+        self.total_flush_seconds += elapsed
+        self._release(batch)
+        for s in batch:
+            s.future.set_result(s.receipt)
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self._queue.qsize(),
+            "pending_bytes": self._pending_bytes,
+            "submitted": self.submitted,
+            "flushed": self.flushed,
+            "failed": self.failed,
+            "batches": self.batches,
+            "last_flush_seconds": self.last_flush_seconds,
+            "avg_flush_seconds": self.total_flush_seconds / self.batches if self.batches else None,
+        }
+
+_submission_queue = None
+_submission_queue_lock = threading.Lock()
+
+def get_submission_queue(flush) -> SubmissionQueue:
+    """
+    Process-wide queue; `flush` is only used by the call that creates it.
+    """
+    global _submission_queue
+    with _submission_queue_lock:
+        if _submission_queue is None:
+            _submission_queue = SubmissionQueue(flush)
+        return _submission_queue
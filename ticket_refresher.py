@@ -0,0 +1,99 @@
+import logging
+import os
+import threading
+import time
+
+from ticket_cache import snapshot_cache
+from ticket_metrics import tagged
+
+######################
+# BACKGROUND SNAPSHOT REFRESH
+######################
+
+logger = logging.getLogger(__name__)
+
+# Longest wait after a failed refresh before trying again (the retry delay doubles up to this).
+MAX_RETRY_SECONDS = float(os.environ.get("TICKET_REFRESH_MAX_RETRY", "60"))
+
+class SnapshotRefresher:
+    """
+    Daemon thread that keeps the shared snapshot current so page reruns never wait on Snowflake.
+    It calls refresh() whenever the cache's snapshot goes stale: when the TTL runs out and
+    right after invalidate()/resync(). Reruns read the last published snapshot via
+    snapshot_cache.peek(); a failed refresh keeps serving it and is retried with backoff.
+    """
+
+    def __init__(self, refresh, cache=snapshot_cache, retry_seconds: float = 1.0):
+        self.refresh = refresh
+        self.cache = cache
+        self.retry_seconds = retry_seconds
+        self.refreshes = 0
+        self.failures = 0
+        self.last_error = None
+        self.failing_since = None
+        self.last_refresh_seconds = None
+        self._worker = threading.Thread(target=self._run, name="ticket-snapshot-refresher", daemon=True)
+        self._worker.start()
+
+    def _run(self):
+        while True:
+            self.cache.wait_until_stale()
+            start = time.perf_counter()
+            try:
+                with tagged("refresher", "refresh"):
+                    self.refresh()
+            except Exception as e:
+                self.failures += 1
+                self.last_error = str(e)
+                self.failing_since = self.failing_since or time.time()
+                delay = min(self.retry_seconds * 2 ** (self.failures - 1), MAX_RETRY_SECONDS)
+                logger.warning("Ticket snapshot refresh failed (retrying in %.0fs): %s", delay, e)
+                time.sleep(delay)
+            else:
+                self.refreshes += 1
+                self.failures = 0
+                self.last_error = None
+                self.failing_since = None
+                self.last_refresh_seconds = time.perf_counter() - start
+
+    def staleness(self) -> dict:
+        """
+        How old the served snapshot is: `as_of` (when it was loaded), `age_seconds`, `max_age_seconds`
+        (the bound on missed inserts and edits while refreshes succeed: TTL plus the last refresh
+        time), `synced_at` (the last full reload, which also catches other writers' deletes), whether a newer
+        version is pending (`refreshing`) and the current error, if refreshes are failing.
+        """
+        snapshot = self.cache.peek()
+        if snapshot is None:
+            return {"as_of": None, "age_seconds": None, "max_age_seconds": None, "synced_at": None, "refreshing": True,
+                    "error": self.last_error, "failing_since": self.failing_since}
+        return {
+            "as_of": snapshot.loaded_at,
+            "age_seconds": time.time() - snapshot.loaded_at,
+            "max_age_seconds": self.cache.ttl_seconds + (self.last_refresh_seconds or 0),
+            "synced_at": snapshot.synced_at,
+            "refreshing": snapshot.version != self.cache.version,
+            "error": self.last_error,
+            "failing_since": self.failing_since,
+        }
+
+    def stats(self) -> dict:
+        return {
+            "refreshes": self.refreshes,
+            "failures": self.failures,
+            "last_refresh_seconds": self.last_refresh_seconds,
+            "last_error": self.last_error,
+        }
+
+_refresher = None
+_refresher_lock = threading.Lock()
+
+def get_refresher(refresh) -> SnapshotRefresher:
+    """
+    Process-wide refresher; `refresh` is only used by the call that creates it.
+    """
+    global _refresher
+    with _refresher_lock:
+        if _refresher is None:
+            _refresher = SnapshotRefresher(refresh)
+        return _refresher
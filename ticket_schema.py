@@ -0,0 +1,81 @@
+import pandas as pd
+import pyarrow as pa
+
+from ticket_index import as_categoricals
+
+######################
+# TICKET TABLE SCHEMA
+######################
+
+TICKET_TABLE = "DB_ADI_NA_PROD.SCH_ADI_NA_ENDUSER_REPORTS.ADI_TICKET_SYSTEM"
+
+# Filter options for the PM UI
+REGION_OPTIONS = ["All", "NA", "EMEA"]
+BUSINESS_SEGMENT_OPTIONS = ["All", "Snap One", "Business Support Group", "EMEA"]
+FUNCTION_OPTIONS = [
+    "Branch", "Category Management", "Credit", "Customer Service",
+    "Data Analytics", "Data Comm", "DX", "Inventory", "Other", "Outbound Telesales",
+    "Pro AV", "RAS/NAM", "Snap Accounting", "Snap DX", "Snap Manufacturing & Quality",
+    "Snap Operations", "Snap Rewards & Marketing", "Snap Sales", "Snap Support & Education"
+]
+REQUEST_TYPE_OPTIONS = [
+    "Report Request", "BI Tool Inquiry", "BI Tool Request", "Adhoc/Automated"
+]
+PROJECT_STATUS_OPTIONS = [
+    "Not Assigned", "Assigned", "Pending", "Completed"
+]
+# Known values of the enum columns; these are stored as Categoricals.
+FILTER_CATEGORIES = {
+    "REGION": REGION_OPTIONS[1:],
+    "BUSINESS_SEGMENT": BUSINESS_SEGMENT_OPTIONS[1:],
+    "FUNCTION_NAME": FUNCTION_OPTIONS,
+    "REQUEST_TYPE": REQUEST_TYPE_OPTIONS,
+    "PROJECT_STATUS": PROJECT_STATUS_OPTIONS,
+}
+
+# Optional last-modified timestamp column. When the table has it, incremental refreshes
+# also pick up rows modified by other writers since the previous refresh.
+MODIFIED_COL = "LAST_MODIFIED"
+# Receipt of the ticket form submission that inserted a row; lets a retried insert skip rows
+# that already landed.
+SUBMISSION_COL = "SUBMISSION_ID"
+
+DATE_COLS = ["DATE_CREATED", "DATE_COMPLETED", "ETC"]
+TEXT_COLS = [
+    "REQUESTOR_EMAIL", "REQUEST_TITLE", "REQUEST_NAME", "ASSIGNED_NAME", "COMMENTS",
+    "DOWNLOAD", "ASSIGNED", "DATA_MANAGER"
+]
+
+ARROW_STRING = pd.StringDtype("pyarrow")
+
+def normalize_tickets(frame: pd.DataFrame) -> pd.DataFrame:
+    """
+    Convert a fetched ticket frame to compact dtypes: ID as the narrowest integer,
+    dates as datetime64, enum columns as Categoricals over the *_OPTIONS lists and
+    free text as Arrow-backed strings. Columns not in the schema are left alone.
+    """
+    converted = {}
+    if "ID" in frame.columns and frame["ID"].notna().all():
+        converted["ID"] = pd.to_numeric(frame["ID"], downcast="integer")
+    for column in DATE_COLS + [MODIFIED_COL]:
+        if column in frame.columns and not pd.api.types.is_datetime64_any_dtype(frame[column]):
+            converted[column] = pd.to_datetime(frame[column], errors="coerce")
+    for column in TEXT_COLS:
+        if column in frame.columns and frame[column].dtype != ARROW_STRING:
+            converted[column] = frame[column].astype(ARROW_STRING)
+    return as_categoricals(frame.assign(**converted), FILTER_CATEGORIES)
+
+def _arrow_type(arrow_type):
+    if pa.types.is_string(arrow_type) or pa.types.is_large_string(arrow_type):
+        return ARROW_STRING
+    return None
+
+def tickets_from_arrow(table: pa.Table) -> pd.DataFrame:
+    """
+    Build the normalized ticket frame straight from an Arrow table: string columns go to
+    Arrow-backed strings without passing through Python objects.
+    """
+    return normalize_tickets(table.to_pandas(types_mapper=_arrow_type))
+
+def frame_memory_bytes(frame: pd.DataFrame) -> int:
+    return int(frame.memory_usage(deep=True).sum())
@@ -0,0 +1,95 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+from ticket_index import EMPTY_IDS
+
+######################
+# FULL-TEXT SEARCH
+######################
+
+# Free-text columns covered by the search box.
+SEARCH_COLS = ["REQUEST_TITLE", "REQUEST_NAME", "COMMENTS"]
+
+TOKEN = re.compile(r"\w+")
+
+def tokenize(text: str) -> list:
+    return TOKEN.findall(text.lower())
+
+def _postings(frame: pd.DataFrame, columns, key: str) -> dict:
+    """
+    {term: sorted ID array} for the rows of frame.
+    """
+    parts = []
+    for column in columns:
+        if column not in frame.columns:
+            continue
+        terms = frame[column].astype(object).where(frame[column].notna(), "").str.lower().str.findall(TOKEN.pattern)
+        parts.append(pd.DataFrame({"TERM": terms, "ID": frame[key].to_numpy(dtype=np.int64)}).explode("TERM"))
+    if not parts:
+        return {}
+    pairs = pd.concat(parts).dropna().drop_duplicates().sort_values(["TERM", "ID"])
+    terms, starts = np.unique(pairs["TERM"].to_numpy(dtype=object), return_index=True)
+    ids = np.split(pairs["ID"].to_numpy(dtype=np.int64), starts[1:])
+    return dict(zip(terms, ids))
+
+class SearchIndex:
+    """
+    Inverted index from lower-cased word tokens to sorted ticket-ID arrays. Every query term
+    matches as a prefix (so results follow the typing), and all terms must match (AND).
+    Kept in the snapshot's derived values; the cache carries it across delta refreshes via updated().
+    """
+
+    def __init__(self, postings: dict, columns=SEARCH_COLS):
+        self.columns = list(columns)
+        self._postings = postings
+        self._terms = np.array(sorted(postings), dtype=object)
+
+    @classmethod
+    def build(cls, frame: pd.DataFrame, columns=SEARCH_COLS, key: str = "ID") -> "SearchIndex":
+        return cls(_postings(frame, columns, key), columns)
+
+    def _prefix_ids(self, prefix: str):
+        start = np.searchsorted(self._terms, prefix, side="left")
+        end = np.searchsorted(self._terms, prefix + "\U0010ffff", side="left")
+        if start == end:
+            return EMPTY_IDS
+        if end - start == 1:
+            return self._postings[self._terms[start]]
+        return np.unique(np.concatenate([self._postings[t] for t in self._terms[start:end]]))
+
+    def search(self, text: str):
+        """
+        Sorted IDs of tickets containing a word starting with each term of `text`,
+        or None for an empty query.
+        """
+        terms = tokenize(text or "")
+        if not terms:
+            return None
+        arrays = sorted((self._prefix_ids(t) for t in dict.fromkeys(terms)), key=len)
+        result = arrays[0]
+        for ids in arrays[1:]:
+            result = np.intersect1d(result, ids, assume_unique=True)
+        return result
+
+    def updated(self, old_frame: pd.DataFrame, rows: pd.DataFrame, deleted_ids=(), key: str = "ID") -> "SearchIndex":
+        """
+        Return a new index reflecting `rows` upserted into `old_frame` (sorted by key) and
+        `deleted_ids` removed. Only the postings of terms the touched tickets had or gain change.
+        """
+        touched = np.union1d(rows[key].to_numpy(dtype=np.int64), np.asarray(list(deleted_ids), dtype=np.int64))
+        old_ids = old_frame[key].to_numpy()
+        pos = np.searchsorted(old_ids, touched)
+        found = pos < len(old_ids)
+        found[found] = old_ids[pos[found]] == touched[found]
+        postings = dict(self._postings)
+        for term, ids in _postings(old_frame.iloc[pos[found]], self.columns, key).items():
+            remaining = np.setdiff1d(postings.get(term, EMPTY_IDS), ids, assume_unique=True)
+            if len(remaining):
+                postings[term] = remaining
+            else:
+                postings.pop(term, None)
+        for term, ids in _postings(rows, self.columns, key).items():
+            postings[term] = np.union1d(postings.get(term, EMPTY_IDS), ids)
+        return SearchIndex(postings, self.columns)
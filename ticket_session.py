@@ -0,0 +1,36 @@
+import threading
+
+######################
+# SNOWFLAKE SESSION
+######################
+
+_session = None
+_session_lock = threading.Lock()
+
+def get_session():
+    """
+    Process-wide Snowpark session built from st.secrets["snowflake"] on the first call and
+    reused by every rerun and user. Snowpark itself is only imported here, on first use.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            import streamlit as st
+            from snowflake.snowpark import Session
+            _session = Session.builder.configs(st.secrets.snowflake).getOrCreate()
+        return _session
+
+class LazySession:
+    """
+    Stand-in for the shared session that connects on first attribute access, so code can be
+    handed "the session" without paying for a connection it may never use.
+    """
+
+    def __getattr__(self, name):
+        return getattr(get_session(), name)
+
+    @property
+    def connected(self) -> bool:
+        return _session is not None
+
+lazy_session = LazySession()
@@ -0,0 +1,502 @@
+import logging
+import os
+import sqlite3
+import threading
+import uuid
+from abc import ABC, abstractmethod
+
+import pandas as pd
+
+from ticket_attachments import is_stage_reference, put_attachment, read_attachment, safe_file_name
+from ticket_metrics import count_statement, count_transfer, query_tag
+from ticket_schema import DATE_COLS, MODIFIED_COL, SUBMISSION_COL, TICKET_TABLE, normalize_tickets, tickets_from_arrow
+from ticket_session import lazy_session
+
+######################
+# TICKET STORE BACKENDS
+######################
+
+logger = logging.getLogger(__name__)
+
+# "snowflake" (default) or "local" for the embedded SQLite stand-in (override with TICKET_STORE).
+DEFAULT_BACKEND = os.environ.get("TICKET_STORE", "snowflake")
+# Database file of the local store, in the user's home rather than the working directory
+# (override with TICKET_STORE_PATH; ":memory:" for a throwaway one).
+DEFAULT_LOCAL_PATH = os.environ.get("TICKET_STORE_PATH", os.path.join(os.path.expanduser("~"), ".adi_tickets", "tickets.db"))
+
+# Session-scoped temp table used to stage a change set before the MERGE (Snowflake suffixes
+# it per call, since the session is shared by every thread of the process).
+CHANGES_TABLE = "ADI_TICKET_CHANGES"
+# Snowflake has no update triggers, so every write sets MODIFIED_COL itself, in UTC.
+SNOWFLAKE_NOW = "SYSDATE()"
+# Brings an existing ticket table up to what the apps maintain (run `python ticket_store.py`).
+# Columns added to a populated table cannot default to the current time, hence the backfill.
+SNOWFLAKE_MIGRATIONS = [
+    f"ALTER TABLE {TICKET_TABLE} ADD COLUMN IF NOT EXISTS {MODIFIED_COL} TIMESTAMP_NTZ",
+    f"UPDATE {TICKET_TABLE} SET {MODIFIED_COL} = {SNOWFLAKE_NOW} WHERE {MODIFIED_COL} IS NULL",
+    f"ALTER TABLE {TICKET_TABLE} ADD COLUMN IF NOT EXISTS {SUBMISSION_COL} VARCHAR",
+]
+# A write is stamped when its statement starts but may commit after a load that already saw later
+# stamps, so delta queries look this far behind the watermark (the re-read rows are upserted).
+SNOWFLAKE_WATERMARK_OVERLAP = pd.Timedelta(seconds=30)
+
+class TicketStore(ABC):
+    """
+    Data access for the ticket table. Frames returned by the fetch methods are normalized
+    (see ticket_schema) and include MODIFIED_COL when the table has it; requested columns
+    the table lacks are skipped.
+    """
+
+    @abstractmethod
+    def fetch(self, columns, filters=None, after_id=None, limit=None) -> pd.DataFrame:
+        """
+        Rows projected to `columns`. `filters` maps column -> value ("All" = no filter);
+        with `after_id`/`limit` the rows are ordered by ID for keyset paging.
+        """
+
+    @abstractmethod
+    def iter_batches(self, columns):
+        """
+        Every row projected to `columns`, as normalized frames in ID order (at least one, possibly empty).
+        """
+
+    @abstractmethod
+    def fetch_changes(self, frame: pd.DataFrame, ids, columns):
+        """
+        Rows added (ID above frame's maximum) or modified (at or after its MODIFIED_COL watermark)
+        since `frame` was loaded, plus the rows in `ids`. None if the projection changed.
+        """
+
+    @abstractmethod
+    def fetch_attachment(self, row_id: int):
+        """
+        The UPLOAD value of one ticket, or None.
+        """
+
+    @abstractmethod
+    def write_changes(self, staged: pd.DataFrame, set_cols) -> int:
+        """
+        Apply a staging frame (ID, DELETED, and <col>/SET_<col> pairs for `set_cols`) in one
+        transaction: DELETED rows are removed, matched rows updated where flagged, and rows without
+        an ID inserted. Rows whose ID no longer exists (deleted meanwhile) are skipped.
+        Returns the number of rows touched.
+        """
+
+    @abstractmethod
+    def insert_rows(self, columns, rows, key=None):
+        """
+        Insert rows of values ordered like `columns`, in one statement where the backend allows.
+        With `key` (one of `columns`), rows whose key value is already stored are skipped, so
+        retrying a batch that did land inserts nothing twice.
+        """
+
+    @abstractmethod
+    def put_attachment(self, data: bytes, file_name: str) -> str:
+        """
+        Store an attachment; returns the reference kept in the UPLOAD column.
+        """
+
+    @abstractmethod
+    def read_attachment(self, upload_value):
+        """
+        Resolve an UPLOAD value to (bytes, file_name); (None, None) when there is no file.
+        """
+
+    def _projection(self, available, columns):
+        return [c for c in list(columns) + [MODIFIED_COL] if c in set(available)]
+
+class SnowflakeTicketStore(TicketStore):
+    """
+    The production backend: Snowpark queries fetched through the connector's Arrow path,
+    MERGE-based batched updates and attachments on the internal stage. The session is shared
+    by all threads; writes are serialized with a lock. Writes stamp MODIFIED_COL once the table
+    has it (see SNOWFLAKE_MIGRATIONS).
+    """
+
+    def __init__(self, session=lazy_session):
+        self.session = session
+        self._lock = threading.RLock()
+        self._table_columns = None
+
+    def _has_column(self, column: str) -> bool:
+        if self._table_columns is None:
+            self._table_columns = set(self.session.table(TICKET_TABLE).columns)
+        return column in self._table_columns
+
+    def migrate(self):
+        """
+        Apply SNOWFLAKE_MIGRATIONS (idempotent).
+        """
+        with self._lock:
+            for sql in SNOWFLAKE_MIGRATIONS:
+                self._sql(sql)
+            self._table_columns = None
+
+    def _statement_params(self) -> dict:
+        count_statement()
+        return {"QUERY_TAG": query_tag()}
+
+    def _sql(self, sql: str, params=None):
+        return self.session.sql(sql, params=params).collect(statement_params=self._statement_params())
+
+    def _to_frame(self, query) -> pd.DataFrame:
+        """
+        Run a Snowpark query through the connector's Arrow fetch and return the normalized
+        ticket frame, without building an object-dtype frame first.
+        """
+        cursor = self.session.connection.cursor()
+        try:
+            cursor.execute(query.queries["queries"][-1], _statement_params=self._statement_params())
+            arrow = cursor.fetch_arrow_all(force_return_table=True)
+        finally:
+            cursor.close()
+        count_transfer(arrow.num_rows, arrow.nbytes)
+        return tickets_from_arrow(arrow)
+
+    def fetch(self, columns, filters=None, after_id=None, limit=None) -> pd.DataFrame:
+        from snowflake.snowpark.functions import col
+        table = self.session.table(TICKET_TABLE)
+        query = table
+        for column, value in (filters or {}).items():
+            if value != "All":
+                query = query.filter(col(column) == value)
+        if after_id is not None:
+            query = query.filter(col("ID") > int(after_id))
+        query = query.select(*self._projection(table.columns, columns))
+        if after_id is not None or limit is not None:
+            query = query.sort(col("ID"))
+        if limit is not None:
+            query = query.limit(limit)
+        return self._to_frame(query)
+
+    def iter_batches(self, columns):
+        from snowflake.snowpark.functions import col
+        table = self.session.table(TICKET_TABLE)
+        query = table.select(*self._projection(table.columns, columns)).sort(col("ID"))
+        cursor = self.session.connection.cursor()
+        try:
+            cursor.execute(query.queries["queries"][-1], _statement_params=self._statement_params())
+            yielded = False
+            for batch in cursor.fetch_arrow_batches():
+                yielded = True
+                count_transfer(batch.num_rows, batch.nbytes)
+                yield tickets_from_arrow(batch)
+            if not yielded:
+                yield normalize_tickets(pd.DataFrame(columns=[d.name for d in cursor.description]))
+        finally:
+            cursor.close()
+
+    def fetch_changes(self, frame: pd.DataFrame, ids, columns):
+        from snowflake.snowpark.functions import col
+        table = self.session.table(TICKET_TABLE)
+        projection = self._projection(table.columns, columns)
+        if list(frame.columns) != projection:
+            return None
+        max_id = frame["ID"].max()
+        condition = col("ID") > int(max_id) if pd.notna(max_id) else col("ID").is_not_null()
+        if ids:
+            condition = condition | col("ID").isin([int(i) for i in ids])
+        if MODIFIED_COL in frame.columns and frame[MODIFIED_COL].notna().any():
+            watermark = frame[MODIFIED_COL].max() - SNOWFLAKE_WATERMARK_OVERLAP
+            condition = condition | (col(MODIFIED_COL) >= watermark)
+        return self._to_frame(table.filter(condition).select(*projection))
+
+    def fetch_attachment(self, row_id: int):
+        from snowflake.snowpark.functions import col
+        rows = (
+            self.session.table(TICKET_TABLE)
+            .filter(col("ID") == int(row_id))
+            .select("UPLOAD")
+            .collect(statement_params=self._statement_params())
+        )
+        if not rows:
+            return None
+        return rows[0]["UPLOAD"]
+
+    def write_changes(self, staged: pd.DataFrame, set_cols) -> int:
+        changes_table = f"{CHANGES_TABLE}_{uuid.uuid4().hex[:12].upper()}"
+
+        def source_expr(column):
+            return f"TRY_TO_DATE(s.{column})" if column in DATE_COLS else f"s.{column}"
+        targets = [f"{c} = IFF(s.SET_{c}, {source_expr(c)}, t.{c})" for c in set_cols]
+        insert_cols, insert_values = list(set_cols), [source_expr(c) for c in set_cols]
+        if self._has_column(MODIFIED_COL):
+            targets.append(f"{MODIFIED_COL} = {SNOWFLAKE_NOW}")
+            insert_cols.append(MODIFIED_COL)
+            insert_values.append(SNOWFLAKE_NOW)
+        clauses = ["WHEN MATCHED AND s.DELETED THEN DELETE"]
+        if set_cols:
+            clauses.append(f"WHEN MATCHED THEN UPDATE SET {', '.join(targets)}")
+            clauses.append(
+                f"WHEN NOT MATCHED AND s.ID IS NULL AND NOT s.DELETED THEN INSERT ({', '.join(insert_cols)}) "
+                f"VALUES ({', '.join(insert_values)})"
+            )
+        clauses_sql = "\n            ".join(clauses)
+        # One MERGE is atomic on its own, so no explicit transaction is opened on the shared session
+        # (other threads' queries would otherwise run inside it).
+        sql_merge = f"""
+            MERGE INTO {TICKET_TABLE} t
+            USING {changes_table} s
+            ON t.ID = s.ID
+            {clauses_sql}
+        """
+        ddl_cols = "".join(f", {c} VARCHAR, SET_{c} BOOLEAN" for c in set_cols)
+        with self._lock:
+            self._sql(f"CREATE TEMPORARY TABLE {changes_table} (ID NUMBER, DELETED BOOLEAN{ddl_cols})")
+            try:
+                # write_pandas takes no statement parameters; its PUT and COPY run untagged.
+                count_statement()
+                self.session.write_pandas(staged, changes_table, auto_create_table=False, quote_identifiers=False)
+                count_transfer(len(staged), staged.memory_usage(deep=True).sum())
+                result = self._sql(sql_merge)
+            finally:
+                self._sql(f"DROP TABLE IF EXISTS {changes_table}")
+        return sum(int(v) for v in result[0].as_dict().values()) if result else 0
+
+    def insert_rows(self, columns, rows, key=None):
+        if not rows:
+            return
+        columns, rows = list(columns), [list(row) for row in rows]
+        if key is not None and not self._has_column(key):
+            # Table not migrated yet: insert without the key (a retried batch may then land twice).
+            logger.warning("%s has no %s column; run SNOWFLAKE_MIGRATIONS", TICKET_TABLE, key)
+            drop = columns.index(key)
+            columns = columns[:drop] + columns[drop + 1:]
+            rows = [row[:drop] + row[drop + 1:] for row in rows]
+            key = None
+        targets, values = list(columns), [f"s.{c}" for c in columns]
+        if self._has_column(MODIFIED_COL):
+            targets.append(MODIFIED_COL)
+            values.append(SNOWFLAKE_NOW)
+        placeholders = ", ".join(["(" + ", ".join(["?"] * len(columns)) + ")"] * len(rows))
+        sql = f"""
+        INSERT INTO {TICKET_TABLE}
+        ({", ".join(targets)})
+        SELECT {", ".join(values)}
+        FROM (VALUES {placeholders}) AS s ({", ".join(columns)})
+        """
+        if key is not None:
+            sql += f"WHERE NOT EXISTS (SELECT 1 FROM {TICKET_TABLE} t WHERE t.{key} = s.{key})"
+        with self._lock:
+            self._sql(sql, params=[value for row in rows for value in row])
+
+    def put_attachment(self, data: bytes, file_name: str) -> str:
+        count_statement()
+        count_transfer(1, len(data))
+        return put_attachment(self.session, data, file_name)
+
+    def read_attachment(self, upload_value):
+        data, file_name = read_attachment(self.session, upload_value)
+        if data is not None and is_stage_reference(upload_value):
+            count_statement()
+            count_transfer(1, len(data))
+        return data, file_name
+
+# Table name inside the local database (SQLite has no database/schema qualifiers).
+LOCAL_TABLE = TICKET_TABLE.rsplit(".", 1)[-1]
+LOCAL_ATTACHMENTS_TABLE = "ADI_TICKET_ATTACHMENTS"
+# Millisecond timestamps, so the MODIFIED_COL watermark orders edits made within the same second.
+LOCAL_NOW = "strftime('%Y-%m-%d %H:%M:%f', 'now')"
+
+LOCAL_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS {LOCAL_TABLE} (
+    ID INTEGER PRIMARY KEY AUTOINCREMENT,
+    FUNCTION_NAME TEXT,
+    REQUESTOR_EMAIL TEXT,
+    REQUEST_TYPE TEXT,
+    REQUEST_TITLE TEXT,
+    REQUEST_NAME TEXT,
+    DATA_MANAGER TEXT,
+    UPLOAD TEXT,
+    REGION TEXT,
+    BUSINESS_SEGMENT TEXT,
+    DOWNLOAD TEXT,
+    DATE_CREATED TEXT DEFAULT (date('now')),
+    DATE_COMPLETED TEXT,
+    ETC TEXT,
+    ASSIGNED_NAME TEXT,
+    ASSIGNED TEXT,
+    PROJECT_STATUS TEXT DEFAULT 'Not Assigned',
+    COMMENTS TEXT,
+    {MODIFIED_COL} TEXT DEFAULT ({LOCAL_NOW}),
+    {SUBMISSION_COL} TEXT
+);
+CREATE TRIGGER IF NOT EXISTS {LOCAL_TABLE}_MODIFIED AFTER UPDATE ON {LOCAL_TABLE}
+WHEN NEW.{MODIFIED_COL} IS OLD.{MODIFIED_COL}
+BEGIN
+    UPDATE {LOCAL_TABLE} SET {MODIFIED_COL} = {LOCAL_NOW} WHERE ID = NEW.ID;
+END;
+CREATE TABLE IF NOT EXISTS {LOCAL_ATTACHMENTS_TABLE} (PATH TEXT PRIMARY KEY, DATA BLOB);
+"""
+
+class LocalTicketStore(TicketStore):
+    """
+    Embedded SQLite stand-in with the ADI_TICKET_SYSTEM columns (plus MODIFIED_COL, kept by
+    a trigger, and a uniquely indexed SUBMISSION_COL), so both apps and the benchmarks run
+    without a Snowflake account. Attachments live in a side table under "@local/..." references.
+    One connection is shared by all threads and serialized with a lock.
+    """
+
+    def __init__(self, path: str = DEFAULT_LOCAL_PATH, batch_rows: int = 50_000):
+        self.path = path
+        self.batch_rows = batch_rows
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.RLock()
+        self._conn.executescript(LOCAL_SCHEMA)
+        if SUBMISSION_COL not in self._columns():  # databases created before the column existed
+            self._conn.execute(f"ALTER TABLE {LOCAL_TABLE} ADD COLUMN {SUBMISSION_COL} TEXT")
+        self._conn.execute(
+            f"CREATE UNIQUE INDEX IF NOT EXISTS {LOCAL_TABLE}_{SUBMISSION_COL} ON {LOCAL_TABLE} ({SUBMISSION_COL})"
+        )
+        # Statements executed so far (each executemany row counts), for the benchmarks.
+        self.statements = 0
+        self._conn.set_trace_callback(self._count_statement)
+
+    def _count_statement(self, sql):
+        self.statements += 1
+        count_statement()
+
+    def execute(self, sql: str, params=()):
+        """
+        Run one statement and return the cursor (used by the fetch helpers and the benchmarks).
+        """
+        with self._lock:
+            return self._conn.execute(sql, params)
+
+    def _columns(self):
+        return [row[1] for row in self.execute(f"PRAGMA table_info({LOCAL_TABLE})").fetchall()]
+
+    def _query(self, sql: str, params=()) -> pd.DataFrame:
+        with self._lock:
+            frame = pd.read_sql_query(sql, self._conn, params=list(params))
+        count_transfer(len(frame), frame.memory_usage(deep=True).sum())
+        return normalize_tickets(frame)
+
+    def fetch(self, columns, filters=None, after_id=None, limit=None) -> pd.DataFrame:
+        where, params = [], []
+        for column, value in (filters or {}).items():
+            if value != "All":
+                where.append(f"{column} = ?")
+                params.append(value)
+        if after_id is not None:
+            where.append("ID > ?")
+            params.append(int(after_id))
+        sql = f"SELECT {', '.join(self._projection(self._columns(), columns))} FROM {LOCAL_TABLE}"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY ID"
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        return self._query(sql, params)
+
+    def iter_batches(self, columns):
+        projection = self._projection(self._columns(), columns)
+        sql = f"SELECT {', '.join(projection)} FROM {LOCAL_TABLE} ORDER BY ID"
+        with self._lock:
+            yielded = False
+            for batch in pd.read_sql_query(sql, self._conn, chunksize=self.batch_rows):
+                yielded = True
+                count_transfer(len(batch), batch.memory_usage(deep=True).sum())
+                yield normalize_tickets(batch)
+            if not yielded:
+                yield normalize_tickets(pd.DataFrame(columns=projection))
+
+    def fetch_changes(self, frame: pd.DataFrame, ids, columns):
+        projection = self._projection(self._columns(), columns)
+        if list(frame.columns) != projection:
+            return None
+        max_id = frame["ID"].max()
+        conditions, params = ["ID > ?"], [int(max_id) if pd.notna(max_id) else -1]
+        if ids:
+            conditions.append(f"ID IN ({', '.join('?' * len(ids))})")
+            params.extend(int(i) for i in ids)
+        if MODIFIED_COL in frame.columns and frame[MODIFIED_COL].notna().any():
+            conditions.append(f"{MODIFIED_COL} >= ?")
+            params.append(frame[MODIFIED_COL].max().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3])
+        return self._query(f"SELECT {', '.join(projection)} FROM {LOCAL_TABLE} WHERE {' OR '.join(conditions)}", params)
+
+    def fetch_attachment(self, row_id: int):
+        row = self.execute(f"SELECT UPLOAD FROM {LOCAL_TABLE} WHERE ID = ?", (int(row_id),)).fetchone()
+        return row[0] if row else None
+
+    def write_changes(self, staged: pd.DataFrame, set_cols) -> int:
+        columns = ["ID", "DELETED"] + [c for column in set_cols for c in (column, f"SET_{column}")]
+        values = staged[columns].astype(object)
+        values = values.where(values.notna(), None)
+        assignments = ", ".join(f"{c} = CASE WHEN s.SET_{c} THEN s.{c} ELSE {LOCAL_TABLE}.{c} END" for c in set_cols)
+        with self._lock:
+            cursor = self._conn.cursor()
+            cursor.execute("BEGIN")
+            try:
+                cursor.execute(f"DROP TABLE IF EXISTS temp.{CHANGES_TABLE}")
+                cursor.execute(f"CREATE TEMP TABLE {CHANGES_TABLE} ({', '.join(columns)})")
+                cursor.executemany(
+                    f"INSERT INTO temp.{CHANGES_TABLE} VALUES ({', '.join('?' * len(columns))})",
+                    values.itertuples(index=False, name=None),
+                )
+                touched = cursor.execute(
+                    f"DELETE FROM {LOCAL_TABLE} WHERE ID IN (SELECT ID FROM temp.{CHANGES_TABLE} WHERE DELETED)"
+                ).rowcount
+                if set_cols:
+                    touched += cursor.execute(
+                        f"INSERT INTO {LOCAL_TABLE} ({', '.join(set_cols)}) "
+                        f"SELECT {', '.join(set_cols)} FROM temp.{CHANGES_TABLE} s "
+                        f"WHERE s.ID IS NULL AND NOT s.DELETED"
+                    ).rowcount
+                    touched += cursor.execute(
+                        f"UPDATE {LOCAL_TABLE} SET {assignments} FROM temp.{CHANGES_TABLE} s "
+                        f"WHERE {LOCAL_TABLE}.ID = s.ID AND NOT s.DELETED"
+                    ).rowcount
+                cursor.execute("COMMIT")
+            except Exception:
+                cursor.execute("ROLLBACK")
+                raise
+        return touched
+
+    def insert_rows(self, columns, rows, key=None):
+        if not rows:
+            return
+        sql = f"INSERT INTO {LOCAL_TABLE} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+        if key is not None:
+            sql += f" ON CONFLICT ({key}) DO NOTHING"
+        with self._lock:
+            self._conn.executemany(sql, rows)
+
+    def put_attachment(self, data: bytes, file_name: str) -> str:
+        location = f"@local/{uuid.uuid4().hex}/{safe_file_name(file_name)}"
+        self.execute(f"INSERT INTO {LOCAL_ATTACHMENTS_TABLE} VALUES (?, ?)", (location, data))
+        return location
+
+    def read_attachment(self, upload_value):
+        if not is_stage_reference(upload_value):
+            # Inline (legacy base64) values are decoded without touching any storage.
+            return read_attachment(None, upload_value)
+        row = self.execute(f"SELECT DATA FROM {LOCAL_ATTACHMENTS_TABLE} WHERE PATH = ?", (upload_value,)).fetchone()
+        return (row[0], upload_value.rsplit("/", 1)[-1]) if row else (None, None)
+
+def store_source(backend: str = DEFAULT_BACKEND, local_path: str = DEFAULT_LOCAL_PATH):
+    """
+    Identity of the data behind get_store(), recorded with shared snapshot files so a process
+    never adopts a snapshot of another backend or table. None for an in-memory local store.
+    """
+    if backend == "local":
+        return None if local_path == ":memory:" else f"local:{os.path.abspath(local_path)}"
+    return f"snowflake:{TICKET_TABLE}"
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_store() -> TicketStore:
+    """
+    Process-wide store for the backend chosen by TICKET_STORE.
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = LocalTicketStore() if DEFAULT_BACKEND == "local" else SnowflakeTicketStore()
+        return _store
+
+if __name__ == "__main__":
+    SnowflakeTicketStore().migrate()
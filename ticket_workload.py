@@ -0,0 +1,37 @@
+from collections import namedtuple
+
+import pandas as pd
+
+######################
+# WORKLOAD SUMMARY
+######################
+
+# Aggregates behind the PM dashboard. by_region/by_segment are PROJECT_STATUS x REGION /
+# BUSINESS_SEGMENT count tables, open_by_assignee counts tickets not yet Completed per
+# ASSIGNED_NAME (largest first), and median_days_to_complete is over completed tickets.
+WorkloadSummary = namedtuple(
+    "WorkloadSummary", ["total", "by_region", "by_segment", "open_by_assignee", "median_days_to_complete"]
+)
+
+def _status_counts(frame: pd.DataFrame, column: str) -> pd.DataFrame:
+    if column not in frame.columns:
+        return pd.DataFrame()
+    return frame.groupby(["PROJECT_STATUS", column], observed=False).size().unstack(fill_value=0)
+
+def workload_summary(frame: pd.DataFrame) -> WorkloadSummary:
+    """
+    Compute the dashboard aggregates from a ticket snapshot. The results are a few dozen
+    cells, so only these (never the rows) are sent to the browser.
+    """
+    open_tickets = frame[frame["PROJECT_STATUS"] != "Completed"]
+    assignees = open_tickets["ASSIGNED_NAME"].astype(object).where(open_tickets["ASSIGNED_NAME"].notna(), "(unassigned)")
+    open_by_assignee = assignees.value_counts().rename("OPEN_TICKETS").rename_axis("ASSIGNED_NAME")
+    completed = frame[frame["PROJECT_STATUS"] == "Completed"]
+    days = (completed["DATE_COMPLETED"] - completed["DATE_CREATED"]).dt.days.dropna()
+    return WorkloadSummary(
+        total=len(frame),
+        by_region=_status_counts(frame, "REGION"),
+        by_segment=_status_counts(frame, "BUSINESS_SEGMENT"),
+        open_by_assignee=open_by_assignee.reset_index(),
+        median_days_to_complete=float(days.median()) if len(days) else None,
+    )
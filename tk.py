@@ -1,19 +1,34 @@
-import streamlit as st
+import time
+# Script start, for the import and first-paint times logged by main().
+_SCRIPT_START = time.perf_counter()
+import logging
+import queue
 import re
-import base64
-import snowflake.snowpark sp  
-#from snowflake.snowpark 
-from sp import Session
+from concurrent.futures import TimeoutError as FutureTimeout
+import streamlit as st
+from ticket_attachments import MAX_ATTACHMENT_BYTES
+from ticket_metrics import RerunMetrics, show_debug_panel, tagged
+from ticket_queue import get_submission_queue, new_receipt
+# Snowpark and pandas are not imported here: the form renders without them, and the
+# background flush loads them (with ticket_store) and connects on the first submission.
+_IMPORTS_DONE = time.perf_counter()
+
+logger = logging.getLogger(__name__)
+
+# How long the form waits for the batched INSERT (including its retries) before giving up on confirming.
+SUBMIT_TIMEOUT_SECONDS = 30
 
-def encode_file_to_base64(uploaded_file):
-    """Convert an uploaded file to a base64 string."""
-    if uploaded_file:
-        return base64.b64encode(uploaded_file.getvalue()).decode("utf-8")
-    return None
+# Columns written for each ticket, in the order returned by ticket_row.
+INSERT_COLS = [
+    "Function_Name", "Requestor_Email", "Request_Type", "Request_Title", "Request_Name",
+    "Data_Manager", "Upload", "Region", "Business_Segment", "Download"
+]
 
-def insert_ticket(session, function, email, request_type, request_title, request_name, encoded_file):
+def ticket_row(function, email, request_type, request_title, request_name, attachment=None):
     """
-    Insert ticket details into Snowflake using dynamic SQL.
+    Build the INSERT_COLS values for one ticket.
+    `attachment` is the stage path returned by put_attachment (or None); only that
+    reference is stored in the Upload column, never the file contents.
     This version also sets Region, Business_Segment, and Download based on rules:
       - If function is in group2 (Snap ...), then Region = "NA" and Business_Segment = "Snap One"
       - If the first 4 characters (case-insensitive) are "EMEA", then both Region and Business_Segment are "EMEA"
@@ -22,17 +37,6 @@ def insert_ticket(session, function, email, request_type, request_title, request
       - If a file is uploaded, Download is set to CHR(9660) ("▼"); otherwise, it's NULL.
     """
 
-    def esc(s):
-        """Escape single quotes to avoid SQL injection."""
-        return s.replace("'", "''") if s else ""
-    
-    # Escape user inputs
-    safe_function = esc(function)
-    safe_email = esc(email)
-    safe_rtype = esc(request_type)
-    safe_rtitle = esc(request_title)
-    safe_rname = esc(request_name)
-    
     # Data_Manager logic (unchanged)
     group1 = [
         "Branch", "Category Management", "Credit", "Customer Service",
@@ -50,7 +54,6 @@ def insert_ticket(session, function, email, request_type, request_title, request
         data_manager = "dale.slaughenhaupt@adiglobal.com"
     else:
         data_manager = ""
-    safe_data_manager = esc(data_manager)
     
     # Determine Region and Business_Segment based solely on the function
     fn_upper = function.upper()
@@ -68,52 +71,71 @@ def insert_ticket(session, function, email, request_type, request_title, request
         business_segment = "Business Support Group"
         region = "NA"
 
-    region_expr = f"'{region}'"
-    bs_expr = f"'{business_segment}'"
+    # Download column: if a file is attached, write the down arrow; else NULL.
+    download_val = chr(9660) if attachment else None
 
-    # Upload column: store the base64 string if file attached
-    upload_expr = "NULL"
-    if encoded_file:
-        safe_b64 = encoded_file.replace("'", "''")
-        upload_expr = f"'{safe_b64}'"
+    return [
+        function or "",
+        email or "",
+        request_type or "",
+        request_title or "",
+        request_name or "",
+        data_manager,
+        attachment,
+        region,
+        business_segment,
+        download_val,
+    ]
 
-    # Download column: if a file is attached, write the down arrow; else NULL.
-    if encoded_file:
-        download_val = f"'{chr(9660)}'"
+def insert_tickets(store, rows, receipts=None):
+    """
+    Insert any number of ticket_row() rows with a single multi-row INSERT using bound parameters.
+    With `receipts` (one per row) each row stores its submission receipt, and rows whose receipt
+    is already stored are skipped, so a retried batch never inserts a ticket twice.
+    """
+    if not rows:
+        return
+    if receipts is None:
+        store.insert_rows(INSERT_COLS, rows)
     else:
-        download_val = "NULL"
+        from ticket_schema import SUBMISSION_COL
+        keyed = [list(row) + [receipt] for row, receipt in zip(rows, receipts)]
+        store.insert_rows(INSERT_COLS + [SUBMISSION_COL], keyed, key=SUBMISSION_COL)
+    # Nothing to invalidate: the PM app runs in another process, and its snapshot's next delta
+    # refresh (at most TICKET_CACHE_TTL seconds away) picks up every ID above the ones it holds.
 
-    sql = f"""
-    INSERT INTO DB_ADI_NA_PROD.SCH_ADI_NA_ENDUSER_REPORTS.ADI_TICKET_SYSTEM
-    (
-        Function_Name,
-        Requestor_Email,
-        Request_Type,
-        Request_Title,
-        Request_Name,
-        Data_Manager,
-        Upload,
-        Region,
-        Business_Segment,
-        Download
-    )
-    VALUES (
-        '{safe_function}',
-        '{safe_email}',
-        '{safe_rtype}',
-        '{safe_rtitle}',
-        '{safe_rname}',
-        '{safe_data_manager}',
-        {upload_expr},
-        {region_expr},
-        {bs_expr},
-        {download_val}
-    )
+def insert_ticket(store, function, email, request_type, request_title, request_name, attachment=None):
+    """
+    Insert a single ticket synchronously (see ticket_row for the derived columns).
+    """
+    insert_tickets(store, [ticket_row(function, email, request_type, request_title, request_name, attachment)])
+
+def flush_submissions(store, items):
+    """
+    Submission queue flush: upload each pending attachment, then insert the whole batch at once,
+    keyed by each item's receipt. Uploaded paths are kept on the item so a retried flush reuses them.
+    """
+    rows = []
+    for item in items:
+        if item.get("file_bytes") is not None and item.get("attachment") is None:
+            item["attachment"] = store.put_attachment(item["file_bytes"], item["file_name"])
+        rows.append(ticket_row(item["function"], item["email"], item["request_type"],
+                               item["request_title"], item["request_name"], item.get("attachment")))
+    insert_tickets(store, rows, [item["receipt"] for item in items])
+
+def flush_to_store(items):
+    """
+    flush_submissions against the process-wide store (Snowflake, or local with TICKET_STORE=local).
     """
-    session.sql(sql).collect()
+    from ticket_store import get_store
+    with tagged("tk", "flush"):
+        flush_submissions(get_store(), items)
 
 def main():
     st.set_page_config(page_title="Analytics Ticket System", page_icon="📊", layout="centered")
+    rerun = RerunMetrics("tk")
+    rerun.step("render")
+    show_performance = st.sidebar.toggle("Performance panel", help="Phase timings for each rerun.")
 
     # Initialize session state for ticket submission
     if "ticket_submitted" not in st.session_state:
@@ -178,6 +200,7 @@ def main():
                 font-size: 18px; 
                 font-weight: bold;">
         Your ticket has been successfully submitted.<br>
+        Reference: {receipt}<br>
         Please refresh the page if you would like to submit another ticket.
       </p>
     </div>
@@ -189,19 +212,13 @@ def main():
     # If a ticket has already been submitted, display the success message and skip the form
     if st.session_state.ticket_submitted:
         form_container.empty()
-        st.markdown(success_message, unsafe_allow_html=True)
+        st.markdown(success_message.format(receipt=st.session_state.ticket_receipt), unsafe_allow_html=True)
+        record = rerun.finish(st.session_state)
+        if show_performance:
+            show_debug_panel(record)
         return
 
-    # Create Snowflake session
-    #session = Session.builder.getOrCreate()
-
-#    @st.cache_resource
-#    def create_session():
-#        return Session.builder.configs(st.secrets.snowflake).create()
-#    session = create_session()
-    def get_snowflake_session():
-        return Session.builder.configs(st.secrets.snowflake).getOrCreate()
-    session = create_session()
+    # No store or Snowflake session here: the first flush creates them (see flush_to_store).
     with form_container.form("ticket_form"):
         st.markdown("<div class='stForm'>", unsafe_allow_html=True)
 
@@ -255,9 +272,13 @@ def main():
 
         st.markdown("</div>", unsafe_allow_html=True)
 
-    if submit_button:
-        encoded_file = encode_file_to_base64(uploaded_file) if uploaded_file else None
+    if "first_paint_logged" not in st.session_state:
+        st.session_state.first_paint_logged = True
+        logger.info("Ticket form: imports %.0f ms, first paint %.0f ms",
+                    (_IMPORTS_DONE - _SCRIPT_START) * 1000, (time.perf_counter() - _SCRIPT_START) * 1000)
 
+    if submit_button:
+        rerun.step("submit")
         # Basic validations
         if not function or function.lower() == "select an option":
             st.error("Please select your function.")
@@ -269,17 +290,44 @@ def main():
             st.error("Request Title cannot be empty.")
         elif not request_name.strip():
             st.error("Request Name cannot be empty.")
-        elif uploaded_file and uploaded_file.size > 1_000_000:
+        elif uploaded_file and uploaded_file.size > MAX_ATTACHMENT_BYTES:
             st.error("The file you submitted is too large. Please reduce the size of your file and try again.")
         else:
             try:
-                # Insert ticket with new columns logic
-                insert_ticket(session, function, email, request_type, request_title, request_name, encoded_file)
+                # Hand the ticket to the background writer, which uploads the file and batches the INSERT
+                # with other concurrent submissions; confirm only once that batch is committed.
+                file_bytes = uploaded_file.getvalue() if uploaded_file else None
+                submissions = get_submission_queue(flush_to_store)
+                receipt = new_receipt()  # stored with the ticket, so the reference can be looked up
+                submission = submissions.submit({
+                    "receipt": receipt,
+                    "function": function,
+                    "email": email,
+                    "request_type": request_type,
+                    "request_title": request_title,
+                    "request_name": request_name,
+                    "file_bytes": file_bytes,
+                    "file_name": uploaded_file.name if uploaded_file else None,
+                }, size=len(file_bytes) if file_bytes else 0, receipt=receipt)
+                with st.spinner("Submitting your ticket…"):
+                    submission.future.result(timeout=SUBMIT_TIMEOUT_SECONDS)
                 st.session_state.ticket_submitted = True
+                st.session_state.ticket_receipt = submission.receipt
                 form_container.empty()  # Clear the form container
-                st.markdown(success_message, unsafe_allow_html=True)
+                st.markdown(success_message.format(receipt=submission.receipt), unsafe_allow_html=True)
+            except queue.Full:
+                st.error("The ticket system is busy right now. Please try submitting again in a moment.")
+            except FutureTimeout:
+                st.error(
+                    f"Your ticket (reference {submission.receipt}) could not be confirmed in time. It may "
+                    "still be saved under that reference; please check with the Analytics team before submitting it again."
+                )
             except Exception as e:
                 st.error(f"An error occurred: {e}")
 
+    record = rerun.finish(st.session_state)
+    if show_performance:
+        show_debug_panel(record)
+
 if __name__ == "__main__":
     main()